@@ -1,25 +1,116 @@
 from sqlmodel import SQLModel, Field, create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.users import User, FollowedAsset
 from models.token import UserToken
 from models.followed import Followed
 from models.investments import Investment
 import os
+from config.settings import (
+    DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT_MS,
+)
 
-# 确保数据库目录存在
-db_dir = "models"
+# 确保数据库目录存在（相对于本文件，不依赖启动时的工作目录）
+db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
 os.makedirs(db_dir, exist_ok=True)
 
 # 数据库文件路径
 sqlite_file_name = os.path.join(db_dir, "tradingai.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
+database_url = DATABASE_URL or sqlite_url
 
-# 创建 SQLite 引擎
-engine = create_engine(sqlite_url, echo=True)
 
-# 创建所有表
+# requirements.txt 中安装的同步驱动；postgresql:// 不指定驱动时 SQLAlchemy 默认使用未安装的 psycopg2
+SUPPORTED_SCHEMES = {"sqlite", "postgresql+psycopg"}
+
+
+def normalize_url(url):
+    """统一数据库 URL 的驱动：postgres:// 和 postgresql:// 使用 psycopg（v3），不支持的驱动直接报错"""
+    scheme, sep, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql"):
+        scheme = "postgresql+psycopg"
+    if not sep or scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(
+            f"不支持的 DATABASE_URL 驱动 '{scheme}'，请使用 sqlite:/// 或 postgresql+psycopg://"
+        )
+    return f"{scheme}://{rest}"
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """每个新连接上设置 SQLite 参数：WAL 允许读写并发，NORMAL 在 WAL 下仍然安全且减少 fsync"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _engine_options(url, echo):
+    options = {"echo": echo}
+    if ":memory:" not in url:
+        # 内存数据库使用 SQLAlchemy 默认的单连接池，不支持以下参数
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=not url.startswith("sqlite"),
+        )
+    if url.startswith("sqlite"):
+        # FastAPI 会在线程池中使用会话，连接可能跨线程
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def build_engine(url=database_url, echo=DB_ECHO):
+    """按环境变量创建引擎：连接池大小、溢出、回收时间；SQLite 额外设置 PRAGMA"""
+    url = normalize_url(url)
+    new_engine = create_engine(url, **_engine_options(url, echo))
+    if url.startswith("sqlite"):
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+def async_url(url):
+    """同步驱动 URL -> 对应的异步驱动：SQLite 用 aiosqlite，Postgres 用 psycopg 的异步模式"""
+    url = normalize_url(url)
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return url
+
+
+def build_async_engine(url=database_url, echo=DB_ECHO):
+    """与 build_engine 相同的连接池和 PRAGMA 配置，供 async 路由使用，SQL 不再阻塞事件循环"""
+    url = async_url(url)
+    options = _engine_options(url, echo)
+    if "pool_size" in options:
+        # aiosqlite 默认不使用连接池（NullPool），显式指定后才能复用连接
+        options["poolclass"] = AsyncAdaptedQueuePool
+    new_engine = create_async_engine(url, **options)
+    if url.startswith("sqlite"):
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+engine = build_engine()
+async_engine = build_async_engine()
+
+
+# FastAPI 依赖：异步数据库会话
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+# 创建表并执行尚未应用的数据库迁移
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-    print("📍 Absolute path:", os.path.abspath(sqlite_file_name))
+    from migrations import run_migrations
+    applied = run_migrations(engine)
+    print("📍 Database:", engine.url.render_as_string(hide_password=True), "migrations applied:", applied)
 
 
 
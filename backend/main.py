@@ -1,5 +1,6 @@
 # backend/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,8 +8,32 @@ from fastapi.middleware.cors import CORSMiddleware
 from service.auth import auth_router
 from service.pages_routes import router as main_router  # 👈 你的新业务路由
 from service.user_portfolio import portfolio_router
+from tools.refresher import market_refresher, REFRESH_ENABLED
+from tools.quote_hub import quote_hub
+from service.token_reaper import token_reaper
+from tools.http_client import close_async_client, close_sync_client
+from data import create_db_and_tables, async_engine
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动前把数据库升级到最新版本（建表、索引等）
+    create_db_and_tables()
+    # 启动后台预热，保证仪表盘请求总能命中热缓存
+    if REFRESH_ENABLED:
+        market_refresher.start()
+    # 定期清理过期令牌，UserToken 表不会无限增长
+    token_reaper.start()
+    yield
+    await token_reaper.stop()
+    await market_refresher.stop()
+    # 停止行情推送的轮询任务
+    await quote_hub.stop()
+    await async_engine.dispose()
+    # 关闭共享的 HTTP 连接池
+    await close_async_client()
+    close_sync_client()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
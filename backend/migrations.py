@@ -0,0 +1,123 @@
+# backend/migrations.py
+
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# 已应用的版本记录在 schema_version 表中，每个版本只执行一次
+VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+
+def _execute_all(conn, statements):
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _initial_schema(conn):
+    """
+    创建基线表（已存在的表会被跳过，兼容引入迁移之前创建的数据库）
+
+    固定为引入迁移之前 create_all 生成的表结构，不随模型变化；之后的索引和
+    结构变更都在后续版本中完成，新库和旧库经过相同的步骤得到相同的结构。
+    "user" 在 PostgreSQL 中是保留字，需要加引号
+    """
+    _execute_all(conn, [
+        """CREATE TABLE IF NOT EXISTS "user" (
+            id VARCHAR NOT NULL, email VARCHAR NOT NULL, username VARCHAR NOT NULL,
+            hashed_password VARCHAR NOT NULL, is_active BOOLEAN NOT NULL,
+            created_at TIMESTAMP NOT NULL, updated_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (id)
+        )""",
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_email ON "user" (email)',
+        """CREATE TABLE IF NOT EXISTS followedasset (
+            id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, asset_symbol VARCHAR NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY (user_id) REFERENCES "user" (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS usertoken (
+            id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, token VARCHAR NOT NULL,
+            expires_at TIMESTAMP NOT NULL, created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY (user_id) REFERENCES "user" (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS followed (
+            id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, symbol VARCHAR NOT NULL, asset_type VARCHAR NOT NULL,
+            added_at TIMESTAMP NOT NULL, name VARCHAR, notes VARCHAR,
+            PRIMARY KEY (id), FOREIGN KEY (user_id) REFERENCES "user" (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS investment (
+            id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, symbol VARCHAR NOT NULL, asset_type VARCHAR NOT NULL,
+            quantity FLOAT NOT NULL, price_per_unit FLOAT NOT NULL, transaction_date TIMESTAMP NOT NULL,
+            transaction_type VARCHAR NOT NULL, source VARCHAR NOT NULL, fees FLOAT, notes VARCHAR,
+            created_at TIMESTAMP NOT NULL, updated_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY (user_id) REFERENCES "user" (id)
+        )""",
+    ])
+
+
+def _add_lookup_indexes(conn):
+    """为鉴权和组合接口的查询列建立索引，并补上关注列表的唯一约束"""
+    # 建唯一索引前先清理重复关注，每组保留最早关注的一条（id 是随机 UUID，只用于同一时间的排序）
+    conn.execute(text(
+        "DELETE FROM followed WHERE EXISTS ("
+        "SELECT 1 FROM followed AS earlier WHERE earlier.user_id = followed.user_id "
+        "AND earlier.asset_type = followed.asset_type AND earlier.symbol = followed.symbol "
+        "AND (earlier.added_at < followed.added_at "
+        "OR (earlier.added_at = followed.added_at AND earlier.id < followed.id)))"
+    ))
+    _execute_all(conn, [
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_followed_user_type_symbol ON followed (user_id, asset_type, symbol)",
+        "CREATE INDEX IF NOT EXISTS ix_investment_user_symbol ON investment (user_id, symbol)",
+        "CREATE INDEX IF NOT EXISTS ix_investment_user_type ON investment (user_id, asset_type)",
+        "CREATE INDEX IF NOT EXISTS ix_usertoken_user_token ON usertoken (user_id, token)",
+        "CREATE INDEX IF NOT EXISTS ix_usertoken_token ON usertoken (token)",
+        "CREATE INDEX IF NOT EXISTS ix_followedasset_user_id ON followedasset (user_id)",
+    ])
+
+
+def _add_token_expiry_index(conn):
+    """过期令牌清理按 expires_at 范围删除"""
+    _execute_all(conn, [
+        "CREATE INDEX IF NOT EXISTS ix_usertoken_expires_at ON usertoken (expires_at)",
+    ])
+
+
+# (版本号, 说明, 迁移函数)，只能在末尾追加，不要修改已发布的版本；
+# 迁移中写固定的 DDL，不要引用模型上的 __table__.indexes（模型变化会改变旧版本的行为）
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "lookup indexes and unique followed assets", _add_lookup_indexes),
+    (3, "usertoken expires_at index", _add_token_expiry_index),
+]
+
+
+def current_version(conn):
+    conn.execute(text(VERSION_TABLE))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def run_migrations(engine):
+    """按版本顺序执行尚未应用的迁移，每个版本在独立事务中完成，返回本次应用的版本号"""
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": number, "d": description, "t": datetime.now(timezone.utc)},
+            )
+        logger.info(f"✅ 数据库迁移 {number}: {description}")
+        applied.append(number)
+    return applied
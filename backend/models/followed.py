@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
@@ -15,5 +16,10 @@ class Followed(SQLModel, table=True):
     notes: Optional[str] = None  # 用户笔记
     
     # 添加唯一约束，确保用户不能重复关注同一资产
+    # 列顺序 (user_id, asset_type, symbol)：同一索引同时服务按用户、按用户+类型的列表查询
+    __table_args__ = (
+        Index("uq_followed_user_type_symbol", "user_id", "asset_type", "symbol", unique=True),
+    )
+
     class Config:
         table_name = "followed"
\ No newline at end of file
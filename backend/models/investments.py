@@ -1,9 +1,16 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
 
 class Investment(SQLModel, table=True):
+    # 列表接口按用户过滤，并可再按代码或资产类型过滤
+    __table_args__ = (
+        Index("ix_investment_user_symbol", "user_id", "symbol"),
+        Index("ix_investment_user_type", "user_id", "asset_type"),
+    )
+
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     symbol: str
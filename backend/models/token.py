@@ -1,13 +1,19 @@
 # models/token.py
 
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
 
 class UserToken(SQLModel, table=True):
+    # 鉴权按 (user_id, token) 查找；最左前缀同时服务按用户的会话查询
+    __table_args__ = (
+        Index("ix_usertoken_user_token", "user_id", "token"),
+    )
+
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     user_id: str = Field(foreign_key="user.id")
-    token: str
-    expires_at: datetime
+    token: str = Field(index=True)  # 登出只按令牌查找
+    expires_at: datetime = Field(index=True)  # 过期令牌清理按该列范围删除
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -16,7 +16,7 @@ class User(SQLModel, table=True):
 
 class FollowedAsset(SQLModel, table=True):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    user_id: str = Field(foreign_key="user.id")
+    user_id: str = Field(foreign_key="user.id", index=True)
     asset_symbol: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     user: User = Relationship(back_populates="followed_assets")
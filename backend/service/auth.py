@@ -1,16 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request  # 添加Request导入
-from sqlmodel import Session, select
+from sqlmodel import Session, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 from typing import Optional
 import logging  # 添加调试代码: 导入logging
+import hashlib
+import uuid
+import time
+import os
 
 from models.users import User
 from models.token import UserToken
-from config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from data import engine
+from config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, MAX_SESSIONS_PER_USER, BCRYPT_ROUNDS
+from data import engine, get_async_session
+from tools.cache import TTLCache
+from tools.executor import bcrypt_pool, PoolSaturated
 
 from pydantic import BaseModel
 
@@ -33,7 +41,7 @@ class Token(BaseModel):
 
 # ------------------ FastAPI setup ------------------ #
 auth_router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 # ------------------ DB Dependency ------------------ #
@@ -41,6 +49,9 @@ def get_db():
     with Session(engine) as session:
         yield session
 
+# async 路由使用的会话，查询不阻塞事件循环
+get_async_db = get_async_session
+
 # ------------------ Password Utils ------------------ #
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
@@ -48,6 +59,24 @@ def verify_password(plain: str, hashed: str) -> bool:
 def hash_password(pw: str) -> str:
     return pwd_context.hash(pw)
 
+# bcrypt 计算量大，在专用线程池中执行，不阻塞事件循环；排队已满时返回 503
+async def _run_bcrypt(func, *args):
+    try:
+        return await bcrypt_pool.run(func, *args)
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+async def hash_password_async(pw: str) -> str:
+    return await _run_bcrypt(pwd_context.hash, pw)
+
+async def verify_and_update_password(plain: str, hashed: str):
+    """返回 (是否匹配, 新哈希或 None)；成本因子变化后需要重新哈希时返回新哈希"""
+    return await _run_bcrypt(pwd_context.verify_and_update, plain, hashed)
+
 # ------------------ JWT Utils ------------------ #
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -55,75 +84,125 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=60)
-    to_encode.update({"exp": expire})
+    # jti 保证同一秒内多次登录得到不同的令牌，登出/会话上限只影响对应的那一个会话
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     
     # 添加调试代码: 记录令牌创建信息
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    logger.info(f"创建令牌 (前10位): {token[:10]}...")
     return token
 
+# ------------------ Token Cache ------------------ #
+# 已验证令牌的缓存：sha256(令牌) -> 用户快照 (id, email, username, is_active)，
+# 命中时无需解码 JWT 和查询用户；缓存时间不超过 AUTH_CACHE_TTL，
+# 用户资料或 is_active 的修改最迟在该时间后生效
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 300))
+_verified_tokens = TTLCache(max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000)))
+# 吊销集合只在当前进程内有效：多个 worker 时（WEB_CONCURRENCY > 1）缓存命中后仍查询
+# UserToken 行，其他 worker 上的登出立即生效；单 worker 时命中缓存不访问数据库
+AUTH_CACHE_CHECK_TOKEN_ROW = os.getenv(
+    "AUTH_CACHE_CHECK_TOKEN_ROW", "true" if int(os.getenv("WEB_CONCURRENCY", 1)) > 1 else "false"
+).lower() in ("1", "true", "yes")
+# 已登出的令牌，保留到令牌本身过期为止
+_revoked_tokens = TTLCache(max_entries=int(os.getenv("AUTH_REVOKED_MAX_ENTRIES", 100000)))
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _remaining_lifetime(token: str) -> float:
+    """令牌剩余有效期（秒），无法解析时按完整有效期计算"""
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        exp = None
+    if exp is None:
+        return ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    return max(float(exp) - time.time(), 0.0)
+
+def revoke_token(token: str):
+    """登出时调用：立即从已验证缓存中移除，并记入吊销集合"""
+    key = token_key(token)
+    _verified_tokens.delete(key)
+    ttl = _remaining_lifetime(token)
+    if ttl > 0:
+        _revoked_tokens.set(key, True, ttl)
+
 # ------------------ Get Current User ------------------ #
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def _token_row_exists(db: AsyncSession, user_id: str, token: str) -> bool:
+    row = (await db.exec(
+        select(UserToken.id).where(UserToken.user_id == user_id, UserToken.token == token)
+    )).first()
+    return row is not None
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    key = token_key(token)
+    if key in _revoked_tokens:
+        raise HTTPException(status_code=403, detail="Token revoked or expired")
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        user_id, email, username, is_active = cached
+        if AUTH_CACHE_CHECK_TOKEN_ROW and not await _token_row_exists(db, user_id, token):
+            _verified_tokens.delete(key)
+            raise HTTPException(status_code=403, detail="Token revoked or expired")
+        # 每个请求得到独立的对象，处理函数修改它不会影响缓存或其他请求
+        return User(id=user_id, email=email, username=username, is_active=is_active)
+
     try:
-        # 添加调试代码: 记录收到的令牌
-        logger.info(f"收到令牌 (前10位): {token[:10]}...")
-        logger.info(f"使用密钥 (前10位): {SECRET_KEY[:10]}...")
-        logger.info(f"使用算法: {ALGORITHM}")
-        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        
-        # 添加调试代码: 记录解码后的内容
-        logger.info(f"解码成功，Payload: {payload}")
-        
         email = payload.get("sub")
         if email is None:
-            logger.error("令牌中无sub字段")  # 添加调试代码
+            logger.warning("令牌中无sub字段")
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError as e:
-        # 添加调试代码: 记录详细错误信息
-        logger.error(f"JWT解码错误: {str(e)}")
+        logger.warning(f"JWT解码错误: {str(e)}")
         raise HTTPException(status_code=401, detail=f"Token decoding failed: {str(e)}")
 
-    user = db.exec(select(User).where(User.email == email)).first()
+    user = (await db.exec(select(User).where(User.email == email))).first()
     if not user:
-        logger.error(f"未找到用户: {email}")  # 添加调试代码
+        logger.warning(f"未找到用户: {email}")
         raise HTTPException(status_code=404, detail="User not found")
 
     # 修复字段名: 从access_token改为token
-    stored_token = db.exec(
-        select(UserToken).where(UserToken.user_id == user.id, UserToken.token == token)
-    ).first()
-    if not stored_token:
-        logger.error(f"数据库中未找到令牌")  # 添加调试代码
+    if not await _token_row_exists(db, user.id, token):
+        logger.warning("数据库中未找到令牌")
         raise HTTPException(status_code=403, detail="Token revoked or expired")
-    
-    logger.info(f"用户验证成功: {user.username}")  # 添加调试代码
+
+    ttl = min(AUTH_CACHE_TTL, payload["exp"] - time.time()) if "exp" in payload else AUTH_CACHE_TTL
+    if ttl > 0:
+        _verified_tokens.set(key, (user.id, user.email, user.username, user.is_active), ttl)
     return user
 
 # ------------------ Register ------------------ #
 @auth_router.post("/register", response_model=dict)
-def register_user(user_data: UserCreate):
-    existing_user = get_user(user_data.email)
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = (await db.exec(select(User).where(User.email == user_data.email))).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     new_user = User(email=user_data.email, username= user_data.username, hashed_password=hashed_password)
     
-    with Session(engine) as session:
-        session.add(new_user)
-        session.commit()
-        session.refresh(new_user)
+    db.add(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     return {"message": "User created successfully"}
 
 # ------------------ Login ------------------ #
 @auth_router.post("/login", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -139,25 +218,41 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     # 添加调试代码: 记录登录信息
     logger.info(f"用户 {user.username} 登录成功")
     
-    with Session(engine) as session:
-        user_token = UserToken(
-            user_id=user.id,
-            token=access_token,
-            expires_at=datetime.now(timezone.utc) + access_token_expires
-        )
-        session.add(user_token)
-        session.commit()
+    user_token = UserToken(
+        user_id=user.id,
+        token=access_token,
+        expires_at=datetime.now(timezone.utc) + access_token_expires
+    )
+    db.add(user_token)
+    if MAX_SESSIONS_PER_USER > 0:
+        await db.flush()
+        await enforce_session_cap(db, user.id)
+    await db.commit()
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 # ------------------ Logout ------------------ #
 @auth_router.post("/logout")
-def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    # 修复字段名: 从access_token改为token
-    db.exec(select(UserToken).where(UserToken.token == token)).delete()
-    db.commit()
+async def logout(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    revoke_token(token)
+    await db.execute(delete(UserToken).where(UserToken.token == token))
+    await db.commit()
     return {"msg": "Logged out"}
 
+async def enforce_session_cap(db: AsyncSession, user_id: str):
+    """超过 MAX_SESSIONS_PER_USER 时删除该用户最早创建的会话"""
+    overflow = (await db.exec(
+        select(UserToken.id, UserToken.token)
+        .where(UserToken.user_id == user_id)
+        .order_by(UserToken.created_at.desc())
+        .offset(MAX_SESSIONS_PER_USER)
+    )).all()
+    if not overflow:
+        return
+    await db.execute(delete(UserToken).where(UserToken.id.in_([row[0] for row in overflow])))
+    for _, old_token in overflow:
+        revoke_token(old_token)
+
 # ------------------ Profile Info ------------------ #
 @auth_router.get("/me")
 def get_profile(user: User = Depends(get_current_user)):
@@ -175,8 +270,8 @@ async def debug_headers(request: Request):
     return {"auth_header": auth_header}
 
 @auth_router.get("/user-by-email")
-def user_by_email(email: str):
-    user = get_user(email)
+async def user_by_email(email: str, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.exec(select(User).where(User.email == email))).first()
     if not user:
         raise HTTPException(404, "User not found")
     return user
@@ -187,10 +282,15 @@ def get_user(email: str):
         user = session.exec(statement).first()
         return user
 
-def authenticate_user(email: str, password: str):
-    user = get_user(email)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = (await db.exec(select(User).where(User.email == email))).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return False
-    return user
\ No newline at end of file
+    if new_hash:
+        # BCRYPT_ROUNDS 调整后，旧哈希在登录成功时升级
+        user.hashed_password = new_hash
+        db.add(user)
+    return user
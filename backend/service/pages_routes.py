@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Query
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from tools.market_indexes import get_market_indexes  
 from tools.stock_utils import get_top_traded_stocks, search_stocks, get_stock_details, get_stock_historical_data
 from tools.crypto_utils import get_top_cryptos, search_cryptos, get_crypto_details
 from tools.news_utils import get_latest_market_news, get_stock_related_news, get_portfolio_news, get_stock_related_news_EODHO
+from tools.cache import get_cache_stats
+from tools.quote_hub import quote_hub, HubFull
 
 
 router = APIRouter()
@@ -29,6 +33,50 @@ async def top_cryptos(limit: int = Query(5, ge=1, le=10)):
     """
     return await get_top_cryptos(limit=limit)
 
+@router.get("/stream/quotes")
+async def stream_quotes(request: Request, symbols: str):
+    """
+    通过 Server-Sent Events 推送实时行情
+
+    参数:
+        symbols: 逗号分隔的代码列表, 例如 "AAPL,MSFT,BTC-USD"
+
+    每条消息是 {代码: 变化的字段}，连接建立后先推送已有的完整快照；
+    无法订阅时发送一条 error 事件后结束
+    """
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',') if s.strip()))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="symbols 不能为空")
+    try:
+        quote_hub.check_capacity(symbol_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HubFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    async def event_stream():
+        try:
+            subscription = quote_hub.subscribe(symbol_list)
+        except HubFull as e:
+            # 检查容量之后被其他连接占满：告知客户端稍后重连
+            yield f"event: error\ndata: {json.dumps({'detail': str(e), 'retry_after': 30})}\n\n"
+            return
+        try:
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch(timeout=15)
+                if batch:
+                    yield f"data: {json.dumps(batch)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            quote_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/news/latest")
 async def latest_news(limit: int = Query(5, ge=1, le=10)):
     """
@@ -105,9 +153,21 @@ async def portfolio_news(symbols: str, limit: int = Query(10, ge=1, le=20)):
 async def stock_history(
     symbol: str, 
     period: str = Query("1mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|10y|ytd|max)$"),
-    interval: str = Query("1d", regex="^(1m|2m|5m|15m|30m|60m|90m|1h|1d|5d|1wk|1mo|3mo)$")
+    interval: str = Query("1d", regex="^(1m|2m|5m|15m|30m|60m|90m|1h|1d|5d|1wk|1mo|3mo)$"),
+    format: str = Query("records", regex="^(records|columns)$"),
+    points: Optional[int] = Query(None, ge=3, le=5000)
 ):
     """
     获取股票历史数据，用于图表
+
+    format=columns 时返回并行数组 {date, open, high, low, close, volume}
+    points=N 时用 LTTB 降采样到最多 N 个点
+    """
+    return await get_stock_historical_data(symbol, period, interval, format, points)
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    获取缓存命中率、条目数和淘汰次数等统计信息
     """
-    return await get_stock_historical_data(symbol, period, interval)
\ No newline at end of file
+    return get_cache_stats()
@@ -0,0 +1,78 @@
+# service/token_reaper.py
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.token import UserToken
+from config.settings import TOKEN_REAPER_INTERVAL, TOKEN_REAPER_BATCH_SIZE
+from data import async_engine
+
+logger = logging.getLogger(__name__)
+
+
+def utc_now():
+    # expires_at 按不带时区的 UTC 时间存储（SQLite 不保存时区）
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TokenReaper:
+    """
+    定期删除过期的 UserToken
+
+    每批最多删除 batch_size 行，批与批之间让出事件循环，
+    避免一次大删除长时间占用数据库写锁
+    """
+
+    def __init__(self, engine=async_engine, interval=TOKEN_REAPER_INTERVAL, batch_size=TOKEN_REAPER_BATCH_SIZE):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task = None
+        self.deleted = 0
+        self.runs = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reap(self, now=None):
+        """删除所有已过期的令牌，返回删除数量"""
+        now = now or utc_now()
+        total = 0
+        while True:
+            expired = select(UserToken.id).where(UserToken.expires_at < now).limit(self.batch_size)
+            async with AsyncSession(self.engine) as session:
+                result = await session.execute(delete(UserToken).where(UserToken.id.in_(expired)))
+                await session.commit()
+            total += result.rowcount
+            if result.rowcount < self.batch_size:
+                break
+            await asyncio.sleep(0)
+        self.deleted += total
+        self.runs += 1
+        if total:
+            logger.info(f"🧹 已清理过期令牌 {total} 个")
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning(f"⚠️ 清理过期令牌失败: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+
+token_reaper = TokenReaper()
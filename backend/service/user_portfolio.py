@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
@@ -8,7 +10,15 @@ from models.followed import Followed
 from models.investments import Investment
 from models.users import User
 from service.auth import get_current_user
-from data import engine
+from data import get_async_session
+from tools.quote_engine import get_quotes
+from tools.portfolio_math import (
+    quote_symbol, transactions_frame, compute_positions, value_positions, summarize_positions, positions_to_records
+)
+from tools.portfolio_performance import get_portfolio_performance
+import logging
+
+logger = logging.getLogger(__name__)
 
 # 请求和响应模型
 class FollowedCreate(BaseModel):
@@ -30,16 +40,14 @@ class InvestmentCreate(BaseModel):
 # 创建路由器
 portfolio_router = APIRouter()
 
-# 辅助函数，获取数据库会话
-def get_db():
-    with Session(engine) as session:
-        yield session
+# 辅助函数，获取数据库会话（异步，SQL 不阻塞行情接口所在的事件循环）
+get_db = get_async_session
 
 # 关注列表API端点
 @portfolio_router.get("/followed")
 async def get_followed_items(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     asset_type: Optional[str] = None
 ):
     """获取当前用户的所有关注项目"""
@@ -48,24 +56,24 @@ async def get_followed_items(
     if asset_type:
         query = query.where(Followed.asset_type == asset_type)
     
-    followed_items = db.exec(query).all()
+    followed_items = (await db.exec(query)).all()
     return followed_items
 
 @portfolio_router.post("/followed")
 async def follow_item(
     item: FollowedCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """添加项目到关注列表"""
     # 检查是否已经关注
-    existing = db.exec(
+    existing = (await db.exec(
         select(Followed).where(
             Followed.user_id == user.id,
             Followed.symbol == item.symbol,
             Followed.asset_type == item.asset_type
         )
-    ).first()
+    )).first()
     
     if existing:
         raise HTTPException(
@@ -83,8 +91,16 @@ async def follow_item(
     )
     
     db.add(followed_item)
-    db.commit()
-    db.refresh(followed_item)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发请求同时通过了上面的检查，由唯一索引兜底
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="该项目已在关注列表中"
+        )
+    await db.refresh(followed_item)
     
     return followed_item
 
@@ -92,16 +108,16 @@ async def follow_item(
 async def unfollow_item(
     item_id: str,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """从关注列表中移除项目"""
     # 查找项目
-    followed_item = db.exec(
+    followed_item = (await db.exec(
         select(Followed).where(
             Followed.id == item_id,
             Followed.user_id == user.id
         )
-    ).first()
+    )).first()
     
     if not followed_item:
         raise HTTPException(
@@ -110,8 +126,8 @@ async def unfollow_item(
         )
     
     # 删除项目
-    db.delete(followed_item)
-    db.commit()
+    await db.delete(followed_item)
+    await db.commit()
     
     return {"message": "项目已从关注列表中移除"}
 
@@ -119,7 +135,7 @@ async def unfollow_item(
 @portfolio_router.get("/investments")
 async def get_investments(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     asset_type: Optional[str] = None,
     symbol: Optional[str] = None
 ):
@@ -132,16 +148,32 @@ async def get_investments(
     if symbol:
         query = query.where(Investment.symbol == symbol)
     
-    investments = db.exec(query).all()
+    investments = (await db.exec(query)).all()
     return investments
 
 @portfolio_router.post("/investments")
 async def add_investment(
     investment: InvestmentCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """添加新的投资交易记录"""
+    if investment.transaction_type.lower() == "sell":
+        # 按交易日期重放该代码的全部交易，卖出（包括补录的历史卖出）不能超过当时的持仓；
+        # 与 compute_positions 一样按行情代码归并（大小写、加密货币的 -USD 后缀）
+        target = quote_symbol(investment.symbol, investment.asset_type)
+        existing = (await db.exec(select(Investment).where(
+            Investment.user_id == user.id,
+            Investment.asset_type == investment.asset_type
+        ))).all()
+        same_asset = [inv for inv in existing if quote_symbol(inv.symbol, inv.asset_type) == target]
+        positions = compute_positions(transactions_frame([*same_asset, investment]))
+        if (positions["oversold_quantity"] > 0).any():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="卖出数量超过当时的持仓数量"
+            )
+
     # 创建新投资记录
     new_investment = Investment(
         user_id=user.id,
@@ -157,8 +189,8 @@ async def add_investment(
     )
     
     db.add(new_investment)
-    db.commit()
-    db.refresh(new_investment)
+    await db.commit()
+    await db.refresh(new_investment)
     
     return new_investment
 
@@ -166,16 +198,16 @@ async def add_investment(
 async def delete_investment(
     investment_id: str,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """删除投资交易记录"""
     # 查找投资记录
-    investment = db.exec(
+    investment = (await db.exec(
         select(Investment).where(
             Investment.id == investment_id,
             Investment.user_id == user.id
         )
-    ).first()
+    )).first()
     
     if not investment:
         raise HTTPException(
@@ -184,7 +216,55 @@ async def delete_investment(
         )
     
     # 删除投资记录
-    db.delete(investment)
-    db.commit()
+    await db.delete(investment)
+    await db.commit()
     
-    return {"message": "投资记录已删除"}
\ No newline at end of file
+    return {"message": "投资记录已删除"}
+
+# 组合汇总API端点
+@portfolio_router.get("/summary")
+async def get_portfolio_summary(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    汇总当前用户的所有交易为持仓，并用一次批量报价为所有持仓估值
+
+    返回每个持仓的数量、平均成本、已实现/未实现盈亏和手续费，以及组合合计
+    """
+    investments = (await db.exec(select(Investment).where(Investment.user_id == user.id))).all()
+    positions = compute_positions(transactions_frame(investments))
+
+    # 一次批量请求获取所有持仓的最新价格
+    open_symbols = positions.loc[positions["quantity"] > 0, "symbol"].tolist()
+    prices = {}
+    if open_symbols:
+        try:
+            quotes = await get_quotes(open_symbols)
+            prices = {symbol: quote["close"] for symbol, quote in quotes.items()}
+        except Exception as e:
+            logger.error(f"获取持仓报价失败: {str(e)}")
+
+    positions = value_positions(positions, prices)
+    return {
+        "summary": summarize_positions(positions),
+        "positions": positions_to_records(positions),
+    }
+
+# 组合历史表现API端点
+@portfolio_router.get("/performance")
+async def get_portfolio_performance_route(
+    period: str = Query("1y", regex="^(1mo|3mo|6mo|1y|2y|5y|ytd|max)$"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    按历史收盘价重放当前用户的交易，返回每日组合市值曲线以及
+    时间加权收益、最大回撤和年化波动率
+    """
+    investments = (await db.exec(select(Investment).where(Investment.user_id == user.id))).all()
+    try:
+        return await get_portfolio_performance(user.id, investments, period)
+    except Exception as e:
+        logger.error(f"计算组合历史表现失败: {str(e)}")
+        raise HTTPException(status_code=500, detail="计算组合历史表现失败")
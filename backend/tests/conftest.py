@@ -0,0 +1,19 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+# 服务层模块（service、models、data）以 backend/ 为根导入：from models.x / from tools.x
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 测试不能写入仓库中的数据库文件，也不要启动后台行情刷新
+_TEST_DIR = tempfile.mkdtemp(prefix="tradingai-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'tradingai.db')}")
+os.environ.setdefault("BAR_STORE_PATH", os.path.join(_TEST_DIR, "bars.db"))
+os.environ.setdefault("NEWS_STORE_PATH", os.path.join(_TEST_DIR, "news.db"))
+os.environ.setdefault("MARKET_REFRESH_ENABLED", "false")
+# 测试中使用较低的 bcrypt 成本，注册/登录不拖慢测试
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
@@ -0,0 +1,160 @@
+# backend/tests/test_auth.py
+
+import time
+import asyncio
+import uuid
+from datetime import datetime, timezone, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from data import async_engine, create_db_and_tables
+from service import auth
+
+
+@pytest.fixture(scope="module")
+def client():
+    create_db_and_tables()
+    app = FastAPI()
+    app.include_router(auth.auth_router, prefix="/auth")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def statements():
+    """记录异步引擎上执行的 SQL"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def register(client, password="secret-pw"):
+    email = f"{uuid.uuid4().hex[:10]}@example.com"
+    response = client.post("/auth/register", json={"email": email, "username": "tester", "password": password})
+    assert response.status_code == 200
+    return email
+
+
+def login(client, email, password="secret-pw"):
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_cached_token_skips_database(client, statements):
+    email = register(client)
+    token = login(client, email)
+
+    assert client.get("/auth/me", headers=bearer(token)).json()["email"] == email
+    statements.clear()
+    assert client.get("/auth/me", headers=bearer(token)).json()["email"] == email
+    assert statements == []
+
+
+def test_logout_rejects_cached_token_immediately(client):
+    token = login(client, register(client))
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 200
+    assert auth._verified_tokens.get(auth.token_key(token)) is not None
+
+    assert client.post("/auth/logout", headers=bearer(token)).status_code == 200
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 403
+
+
+def test_cache_holds_a_snapshot_not_the_orm_user(client):
+    email = register(client)
+    token = login(client, email)
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 200
+
+    cached = auth._verified_tokens.get(auth.token_key(token))
+    assert isinstance(cached, tuple) and cached[1] == email
+    first = asyncio.run(auth.get_current_user(token, db=None))
+    second = asyncio.run(auth.get_current_user(token, db=None))
+    first.email = "changed@example.com"
+    assert first is not second and second.email == email
+
+
+def test_cache_hit_rechecks_token_row_when_configured(client, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_CACHE_CHECK_TOKEN_ROW", True)
+    token = login(client, register(client))
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 200
+    assert auth._verified_tokens.get(auth.token_key(token)) is not None
+
+    # 模拟另一个 worker 上的登出：只删除数据库中的令牌行
+    with auth.Session(auth.engine) as session:
+        row = session.exec(auth.select(auth.UserToken).where(auth.UserToken.token == token)).one()
+        session.delete(row)
+        session.commit()
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 403
+
+
+def test_expired_jwt_is_not_served_from_cache(client):
+    email = register(client)
+    token = auth.create_access_token({"sub": email}, expires_delta=timedelta(seconds=2))
+    user = auth.get_user(email)
+    with auth.Session(auth.engine) as session:
+        session.add(auth.UserToken(user_id=user.id, token=token,
+                                   expires_at=datetime.now(timezone.utc) + timedelta(seconds=2)))
+        session.commit()
+
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 200
+    exp = auth.jwt.get_unverified_claims(token)["exp"]
+    time.sleep(max(exp - time.time(), 0) + 1.1)  # jose 按整秒比较 exp
+    # 缓存条目的有效期不超过令牌本身，过期后重新校验 JWT 并被拒绝
+    assert client.get("/auth/me", headers=bearer(token)).status_code == 401
+
+
+def test_session_cap_evicts_oldest_session(client, monkeypatch):
+    monkeypatch.setattr(auth, "MAX_SESSIONS_PER_USER", 2)
+    email = register(client)
+    first = login(client, email)
+    # 第一个会话已进入验证缓存，被淘汰时也要立即失效
+    assert client.get("/auth/me", headers=bearer(first)).status_code == 200
+    second = login(client, email)
+    third = login(client, email)
+
+    assert client.get("/auth/me", headers=bearer(first)).status_code == 403
+    assert client.get("/auth/me", headers=bearer(second)).status_code == 200
+    assert client.get("/auth/me", headers=bearer(third)).status_code == 200
+    user = auth.get_user(email)
+    with auth.Session(auth.engine) as session:
+        tokens = session.exec(auth.select(auth.UserToken.token).where(auth.UserToken.user_id == user.id)).all()
+    assert sorted(tokens) == sorted([second, third])
+
+
+def test_login_returns_503_when_bcrypt_pool_is_saturated(client, monkeypatch):
+    email = register(client)
+    monkeypatch.setattr(auth.bcrypt_pool, "max_pending", 0)
+
+    response = client.post("/auth/login", data={"username": email, "password": "secret-pw"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_password_with_fewer_rounds(client):
+    email = register(client)
+    user = auth.get_user(email)
+    weak_hash = auth.CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret-pw")
+    with auth.Session(auth.engine) as session:
+        user.hashed_password = weak_hash
+        session.add(user)
+        session.commit()
+
+    # 成本因子低于 BCRYPT_ROUNDS 的哈希需要升级
+    valid, new_hash = asyncio.run(auth.verify_and_update_password("secret-pw", weak_hash))
+    assert valid and new_hash.startswith(f"$2b${auth.BCRYPT_ROUNDS:02d}$")
+
+    login(client, email)
+    stored = auth.get_user(email).hashed_password
+    assert stored != weak_hash and stored.startswith(f"$2b${auth.BCRYPT_ROUNDS:02d}$")
+    assert auth.verify_password("secret-pw", stored)
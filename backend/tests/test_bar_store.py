@@ -0,0 +1,111 @@
+# backend/tests/test_bar_store.py
+
+import numpy as np
+import pandas as pd
+from backend.tools.bar_store import BarStore
+
+
+class FakeUpstream:
+    """模拟 yfinance：记录每次请求的参数"""
+
+    def __init__(self, days=400, freq="D"):
+        index = pd.date_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=days,
+                              freq=freq, name="Date")
+        close = np.linspace(100, 200, days)
+        self.frame = pd.DataFrame({
+            "Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+            "Volume": np.full(days, 1000.0),
+        }, index=index)
+        self.calls = []
+
+    def __call__(self, symbol, interval, period=None, start=None):
+        self.calls.append({"period": period, "start": start})
+        if start is not None:
+            return self.frame[self.frame.index >= pd.Timestamp(start, tz="America/New_York")]
+        if period == "1mo":
+            return self.frame[self.frame.index >= self.frame.index[-1] - pd.DateOffset(months=1)]
+        return self.frame
+
+
+def test_repeated_loads_read_locally(tmp_path):
+    upstream = FakeUpstream()
+    store = BarStore(path=str(tmp_path / "bars.db"), fetch=upstream, min_refresh=3600)
+
+    first = store.get_history("AAPL", "1y", "1d")
+    second = store.get_history("AAPL", "1y", "1d")
+    # 更短的范围已被覆盖，也不需要请求上游
+    month = store.get_history("AAPL", "1mo", "1d")
+    last5 = store.get_history("AAPL", "5d", "1d")
+
+    assert len(upstream.calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert first.index.tz is not None
+    assert first["Close"].iloc[-1] == 200.0
+    assert len(month) < len(first)
+    assert len(last5) == 5
+
+
+def test_only_missing_tail_is_fetched(tmp_path):
+    upstream = FakeUpstream()
+    store = BarStore(path=str(tmp_path / "bars.db"), fetch=upstream, min_refresh=0)
+
+    store.get_history("AAPL", "1y", "1d")
+    store.get_history("AAPL", "1y", "1d")
+
+    assert len(upstream.calls) == 2
+    assert upstream.calls[1]["start"] == upstream.frame.index[-1].strftime("%Y-%m-%d")
+
+
+def test_longer_range_triggers_full_fetch(tmp_path):
+    upstream = FakeUpstream()
+    store = BarStore(path=str(tmp_path / "bars.db"), fetch=upstream, min_refresh=3600)
+
+    store.get_history("AAPL", "1mo", "1d")
+    hist = store.get_history("AAPL", "max", "1d")
+
+    assert [c["period"] for c in upstream.calls] == ["1mo", "max"]
+    assert len(hist) == 400
+
+
+def test_full_refresh_rewrites_previously_stored_history(tmp_path):
+    upstream = FakeUpstream()
+    store = BarStore(path=str(tmp_path / "bars.db"), fetch=upstream, min_refresh=3600, full_refresh_days=7)
+
+    store.get_history("AAPL", "1y", "1d")
+    # 拆股/分红后上游返回的复权价格整体变化
+    upstream.frame = upstream.frame * 0.5
+    conn = store._connect()
+    with conn:
+        conn.execute("UPDATE bar_coverage SET full_fetched_at = 0")
+    conn.close()
+
+    # 到期的全量刷新由较短周期的请求触发，仍要重拉整个已覆盖的一年
+    store.get_history("AAPL", "1mo", "1d")
+    year = store.get_history("AAPL", "1y", "1d")
+
+    assert upstream.calls[1]["start"] is not None
+    assert len(upstream.calls) == 2
+    expected = upstream.frame[upstream.frame.index >= year.index[0]]["Close"]
+    np.testing.assert_allclose(year["Close"].to_numpy(), expected.to_numpy())
+    assert year["Close"].iloc[0] < 100
+
+
+def test_short_periods_are_trading_days_not_bars(tmp_path):
+    upstream = FakeUpstream(days=100, freq="W-MON")
+    store = BarStore(path=str(tmp_path / "bars.db"), fetch=upstream, min_refresh=3600)
+
+    store.get_history("AAPL", "1y", "1wk")
+    # 5 个交易日最多跨两根周线，而不是最近 5 根周线
+    assert 1 <= len(store.get_history("AAPL", "5d", "1wk")) <= 2
+    assert len(store.get_history("AAPL", "1d", "1wk")) == 1
+
+
+def test_symbols_are_case_insensitive(tmp_path):
+    upstream = FakeUpstream()
+    store = BarStore(path=str(tmp_path / "bars.db"), fetch=upstream, min_refresh=3600)
+
+    upper = store.get_history("AAPL", "1mo", "1d")
+    lower = store.get_history("aapl", "1mo", "1d")
+
+    assert len(upstream.calls) == 1
+    pd.testing.assert_frame_equal(upper, lower)
@@ -0,0 +1,253 @@
+# backend/tests/test_cache.py
+
+import time
+import asyncio
+import pytest
+from backend.tools.cache import TTLCache, cache_result, cache_store
+
+
+def test_lru_eviction_and_stats():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3, ttl=60)   # 淘汰最久未使用的 b
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_expired_entries_are_purged():
+    cache = TTLCache(max_entries=10, sweep_interval=0)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2, ttl=60)
+    time.sleep(0.02)
+
+    cache.set("other", 3, ttl=60)  # 写入时触发过期清理
+    assert len(cache) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_byte_budget():
+    cache = TTLCache(max_entries=100, max_bytes=300)
+    for i in range(10):
+        cache.set(i, "x" * 100, ttl=60)
+
+    assert cache.bytes <= 300
+    assert cache.get(9) is not None
+    assert cache.get(0) is None
+
+
+def test_cache_result_keeps_per_function_ttl():
+    calls = []
+
+    @cache_result(expire_seconds=0.05)
+    async def fetch(symbol):
+        calls.append(symbol)
+        return symbol.lower()
+
+    async def main():
+        assert await fetch("AAPL") == "aapl"
+        assert await fetch("AAPL") == "aapl"
+        await asyncio.sleep(0.06)
+        assert await fetch("AAPL") == "aapl"
+
+    cache_store.clear()
+    asyncio.run(main())
+    assert calls == ["AAPL", "AAPL"]
+
+
+def test_concurrent_misses_are_coalesced():
+    calls = []
+
+    @cache_result(expire_seconds=60)
+    async def slow_fetch(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.05)
+        return {"symbol": symbol}
+
+    async def main():
+        return await asyncio.gather(*[slow_fetch("AAPL") for _ in range(10)])
+
+    cache_store.clear()
+    results = asyncio.run(main())
+    assert calls == ["AAPL"]
+    assert all(r == {"symbol": "AAPL"} for r in results)
+
+
+def test_errors_are_shared_but_not_cached():
+    calls = []
+
+    @cache_result(expire_seconds=60)
+    async def flaky():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def main():
+        first = await asyncio.gather(flaky(), flaky(), return_exceptions=True)
+        second = await flaky()
+        return first, second
+
+    cache_store.clear()
+    first, second = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in first)
+    assert second == "ok"
+    assert len(calls) == 2
+
+
+def test_stale_while_revalidate():
+    calls = []
+
+    @cache_result(expire_seconds=0.05, stale_seconds=0.2)
+    async def quotes():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    async def main():
+        assert await quotes() == 1
+        await asyncio.sleep(0.06)
+        # 陈旧窗口内：立即返回旧值，后台刷新
+        assert await quotes() == 1
+        await asyncio.sleep(0.05)
+        assert await quotes() == 2
+        # 超过最大陈旧时间后需要等待重新计算
+        await asyncio.sleep(0.3)
+        assert await quotes() == 3
+
+    cache_store.clear()
+    asyncio.run(main())
+    assert len(calls) == 3
+
+
+class FakeRedis:
+    """进程内的假 Redis，只实现 RedisBackend 用到的命令"""
+
+    def __init__(self):
+        self.data = {}
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] <= time.monotonic():
+            del self.data[key]
+            item = None
+        return item
+
+    async def get(self, key):
+        item = self._alive(key)
+        return item[0] if item else None
+
+    async def set(self, key, value, px=None):
+        expires_at = time.monotonic() + px / 1000 if px else float("inf")
+        self.data[key] = (value, expires_at)
+        return True
+
+    async def delete(self, *keys):
+        return sum(1 for k in keys if self.data.pop(k, None) is not None)
+
+    async def scan_iter(self, match=None):
+        prefix = match.rstrip("*") if match else ""
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+
+def test_redis_backend_is_shared_between_workers():
+    from backend.tools.cache import RedisBackend
+
+    server = FakeRedis()
+    # 两个 "worker" 各自持有一个后端实例，但连接同一个 Redis
+    worker_a = RedisBackend(client=server)
+    worker_b = RedisBackend(client=server)
+    calls = []
+
+    def make_cached(backend):
+        @cache_result(expire_seconds=60, backend=backend)
+        async def get_history(symbol):
+            calls.append(symbol)
+            return [{"close": 1.5}] * 2000  # 足够大，走压缩分支
+
+        return get_history
+
+    async def main():
+        first = await make_cached(worker_a)("AAPL")
+        second = await make_cached(worker_b)("AAPL")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert calls == ["AAPL"]
+    assert worker_b.stats()["hits"] == 1
+
+
+def test_redis_backend_uses_server_side_ttl():
+    from backend.tools.cache import RedisBackend
+
+    server = FakeRedis()
+    backend = RedisBackend(client=server)
+
+    async def main():
+        await backend.set("k", {"v": 1}, ttl=0.05)
+        assert await backend.get("k") == {"v": 1}
+        await asyncio.sleep(0.06)
+        return await backend.get("k")
+
+    from backend.tools.cache import _MISSING
+    assert asyncio.run(main()) is _MISSING
+    assert server.data == {}
+
+
+def test_redis_backend_drops_undecodable_values():
+    from backend.tools.cache import RedisBackend, CacheBackend, _MISSING
+
+    server = FakeRedis()
+    backend = RedisBackend(client=server)
+
+    async def main():
+        await server.set(backend._key("k"), b"pnot a pickle")
+        return await backend.get("k")
+
+    assert asyncio.run(main()) is _MISSING
+    assert server.data == {}
+    assert backend.stats()["errors"] == 1
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_cache_keys_are_bound_to_the_signature():
+    from backend.tools.cache import make_key_builder
+
+    async def get_top(limit=5):
+        return limit
+
+    async def get_news(symbols, limit=10):
+        return symbols
+
+    top_key = make_key_builder(get_top)
+    assert top_key((5,), {}) == top_key((), {"limit": 5}) == top_key((), {})
+    assert top_key((6,), {}) != top_key((5,), {})
+
+    news_key = make_key_builder(get_news, unordered=("symbols",))
+    assert news_key((["AAPL", "MSFT"],), {}) == news_key((), {"symbols": ["MSFT", "AAPL"], "limit": 10})
+    assert news_key((["AAPL", "MSFT"],), {}) != news_key((["AAPL"],), {})
+    # 摘要后的键长度固定
+    assert len(news_key((["AAPL"] * 500,), {})) == len(news_key((["AAPL"],), {}))
+    # 重复元素不会被合并：["A", "A", "B"] 与 ["A", "B"] 是不同的调用
+    assert news_key((["A", "A", "B"],), {}) == news_key((["B", "A", "A"],), {})
+    assert news_key((["A", "A", "B"],), {}) != news_key((["A", "B"],), {})
+
+    # 参数错误与直接调用一样抛出 TypeError
+    with pytest.raises(TypeError):
+        news_key((["AAPL"],), {"symbols": ["MSFT"]})
+    with pytest.raises(TypeError):
+        news_key((), {"limit": 5})
@@ -0,0 +1,71 @@
+# backend/tests/test_data.py
+
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import data
+from models.users import User
+from config.settings import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_sqlite_engine_sets_pragmas_and_pool(tmp_path):
+    engine = data.build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.connect() as conn:
+        pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("cache_size") == -SQLITE_CACHE_SIZE_KB
+        assert pragma("busy_timeout") == SQLITE_BUSY_TIMEOUT_MS
+        assert pragma("temp_store") == 2  # MEMORY
+
+    assert engine.pool.size() == DB_POOL_SIZE
+    assert engine.pool._max_overflow == DB_MAX_OVERFLOW
+    assert engine.pool._timeout == DB_POOL_TIMEOUT
+    assert engine.pool._recycle == DB_POOL_RECYCLE
+    assert engine.pool._pre_ping is False
+    engine.dispose()
+
+
+def test_postgres_url_uses_installed_driver():
+    assert data.normalize_url("postgresql://u:p@db:5432/app") == "postgresql+psycopg://u:p@db:5432/app"
+    assert data.normalize_url("postgres://u:p@db/app") == "postgresql+psycopg://u:p@db/app"
+
+    engine = data.build_engine("postgresql://u:p@db:5432/app")
+    assert engine.dialect.driver == "psycopg"
+    assert engine.pool._pre_ping is True
+
+    with pytest.raises(ValueError, match="psycopg2"):
+        data.build_engine("postgresql+psycopg2://u:p@db/app")
+
+
+def test_async_url_swaps_in_async_drivers():
+    assert data.async_url("sqlite:///models/app.db") == "sqlite+aiosqlite:///models/app.db"
+    assert data.async_url("sqlite:////tmp/app.db") == "sqlite+aiosqlite:////tmp/app.db"
+    # psycopg（v3）同一个方言同时支持同步和异步
+    assert data.async_url("postgresql://u:p@db/app") == "postgresql+psycopg://u:p@db/app"
+    assert data.async_url("postgresql+psycopg://u:p@db/app") == "postgresql+psycopg://u:p@db/app"
+
+
+def test_async_session_round_trip(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    SQLModel.metadata.create_all(data.build_engine(url))
+    async_engine = data.build_async_engine(url)
+
+    async def main():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            session.add(User(email="async@example.com", username="async", hashed_password="x"))
+            await session.commit()
+        async with AsyncSession(async_engine) as session:
+            users = (await session.exec(select(User))).all()
+            journal_mode = (await session.execute(text("PRAGMA journal_mode"))).scalar()
+        await async_engine.dispose()
+        return users, journal_mode
+
+    users, journal_mode = asyncio.run(main())
+    assert [u.email for u in users] == ["async@example.com"]
+    # 异步引擎同样设置了 SQLite PRAGMA，并使用可复用连接的连接池
+    assert journal_mode == "wal"
+    assert async_engine.pool.size() == DB_POOL_SIZE
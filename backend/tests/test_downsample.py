@@ -0,0 +1,33 @@
+# backend/tests/test_downsample.py
+
+import numpy as np
+import pandas as pd
+from backend.tools.downsample import lttb_indices, downsample_frame
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50.0  # 单个尖峰必须保留
+
+    idx = lttb_indices(x, y, 300)
+    assert len(idx) == 300
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+
+
+def test_lttb_returns_everything_when_small():
+    assert list(lttb_indices([0, 1, 2], [1, 2, 3], 10)) == [0, 1, 2]
+
+
+def test_downsample_frame_bounds_rows():
+    index = pd.date_range("2000-01-01", periods=5000, freq="D", tz="America/New_York")
+    close = np.linspace(1, 100, 5000)
+    hist = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0}, index=index)
+
+    small = downsample_frame(hist, 200)
+    assert len(small) == 200
+    assert small.index[0] == hist.index[0]
+    assert small.index[-1] == hist.index[-1]
+    assert list(small.columns) == list(hist.columns)
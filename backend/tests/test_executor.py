@@ -0,0 +1,116 @@
+# backend/tests/test_executor.py
+
+import time
+import asyncio
+import pytest
+from backend.tools.executor import BlockingPool, PoolSaturated
+
+
+def test_blocking_calls_run_in_parallel():
+    pool = BlockingPool("test", max_workers=4, timeout=5)
+
+    async def main():
+        start = time.monotonic()
+        results = await asyncio.gather(*[pool.run(time.sleep, 0.2) for _ in range(4)])
+        return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(main())
+    assert len(results) == 4
+    # 4 个 0.2s 的调用并行执行，总耗时应远小于串行的 0.8s
+    assert elapsed < 0.6
+    assert pool.stats()["completed"] == 4
+    pool.shutdown()
+
+
+def test_concurrency_cap_and_timeout():
+    pool = BlockingPool("test", max_workers=1, timeout=5)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(pool.run(time.sleep, 0.1), pool.run(time.sleep, 0.1))
+        elapsed = time.monotonic() - start
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 0.5, timeout=0.05)
+        return elapsed
+
+    elapsed = asyncio.run(main())
+    # 并发上限为 1 时两个调用只能依次执行
+    assert elapsed >= 0.2
+    assert pool.stats()["timed_out"] == 1
+    pool.shutdown()
+
+
+def test_max_pending_rejects_overflow():
+    pool = BlockingPool("test", max_workers=1, max_pending=2)
+
+    async def main():
+        running = [asyncio.ensure_future(pool.run(time.sleep, 0.1)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0.1)
+        await asyncio.gather(*running)
+        # 之前的调用完成后名额被释放
+        await pool.run(time.sleep, 0)
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+    assert stats["completed"] == 3
+    pool.shutdown()
+
+
+def test_timed_out_call_keeps_its_slot_until_thread_finishes():
+    pool = BlockingPool("test", max_workers=1, timeout=0.05, max_pending=1)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 0.3)
+        # 调用方已超时，但线程仍在运行，名额没有归还；它在执行中，不计入排队
+        stats = pool.stats()
+        assert (stats["pending"], stats["active"], stats["queued"]) == (1, 1, 0)
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0)
+        await asyncio.sleep(0.4)
+        assert pool.stats()["pending"] == 0
+        await pool.run(time.sleep, 0)
+
+    asyncio.run(main())
+    assert pool.stats()["pending"] == 0
+    pool.shutdown()
+
+
+def test_queued_call_cancelled_by_timeout_releases_its_slot():
+    pool = BlockingPool("test", max_workers=1, timeout=5, max_pending=4)
+
+    async def main():
+        busy = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        # 排队中的调用超时后被取消，不会再执行
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 0, timeout=0.05)
+        stats = pool.stats()
+        assert (stats["pending"], stats["active"], stats["queued"]) == (1, 1, 0)
+        await busy
+
+    asyncio.run(main())
+    assert pool.stats()["pending"] == 0
+    pool.shutdown()
+
+
+def test_queued_counts_calls_waiting_behind_a_timed_out_call():
+    pool = BlockingPool("test", max_workers=1, timeout=5)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 0.3, timeout=0.05)
+        waiting = asyncio.ensure_future(pool.run(time.sleep, 0))
+        await asyncio.sleep(0.01)
+        stats = pool.stats()
+        await waiting
+        return stats
+
+    stats = asyncio.run(main())
+    assert (stats["active"], stats["queued"]) == (1, 1)
+    assert pool.stats()["queued"] == 0
+    pool.shutdown()
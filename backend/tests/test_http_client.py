@@ -0,0 +1,84 @@
+# backend/tests/test_http_client.py
+
+import asyncio
+import httpx
+import pytest
+from backend.tools import http_client
+
+
+def flaky_handler(failures, status=503):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) <= failures:
+            return httpx.Response(status)
+        return httpx.Response(200, json={"ok": True, "calls": len(calls)})
+    return handler, calls
+
+
+def use_transport(handler):
+    entry = http_client._get_loop_client()
+    entry.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return entry
+
+
+def test_request_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(http_client, "_backoff_delay", lambda attempt, response=None: 0)
+    handler, calls = flaky_handler(failures=2)
+
+    async def main():
+        use_transport(handler)
+        try:
+            return await http_client.get_json("https://example.com/news", retries=2)
+        finally:
+            await http_client.close_async_client()
+
+    assert asyncio.run(main()) == {"ok": True, "calls": 3}
+
+
+def test_request_gives_up_and_does_not_retry_client_errors(monkeypatch):
+    monkeypatch.setattr(http_client, "_backoff_delay", lambda attempt, response=None: 0)
+    handler, calls = flaky_handler(failures=10)
+    not_found, not_found_calls = flaky_handler(failures=10, status=404)
+
+    async def main():
+        use_transport(handler)
+        with pytest.raises(httpx.HTTPStatusError):
+            await http_client.request("GET", "https://example.com/news", retries=1)
+        use_transport(not_found)
+        with pytest.raises(httpx.HTTPStatusError):
+            await http_client.request("GET", "https://example.com/missing", retries=3)
+        await http_client.close_async_client()
+
+    asyncio.run(main())
+    assert len(calls) == 2
+    assert len(not_found_calls) == 1
+
+
+def test_client_is_shared_within_a_loop():
+    async def main():
+        first = http_client.get_async_client()
+        second = http_client.get_async_client()
+        await http_client.close_async_client()
+        return first is second
+
+    assert asyncio.run(main())
+
+
+def test_llm_completion_post_is_not_retried(monkeypatch):
+    from backend.tools import llm_client
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(502)
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(http_client, "_backoff_delay", lambda attempt, response=None: 0)
+    monkeypatch.setattr(http_client, "_sync_client", httpx.Client(transport=httpx.MockTransport(handler)))
+
+    # 计费的补全请求失败后直接报错，不会被重复提交
+    with pytest.raises(Exception, match="502"):
+        llm_client.create_deepseek_request([{"role": "user", "content": "hi"}])
+    assert calls == ["POST"]
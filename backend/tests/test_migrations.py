@@ -0,0 +1,91 @@
+# backend/tests/test_migrations.py
+
+import sqlite3
+from sqlalchemy import create_engine, inspect
+from sqlmodel import SQLModel
+from migrations import MIGRATIONS, run_migrations
+# 导入模型以注册到 SQLModel.metadata，用于比较新库与模型的列
+from models import users, token, followed, investments  # noqa: F401
+
+# 引入迁移之前 create_all 生成的表结构（没有任何查询索引）
+BASELINE_SCHEMA = """
+CREATE TABLE user (
+    id VARCHAR NOT NULL, email VARCHAR NOT NULL, username VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL, is_active BOOLEAN NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_user_email ON user (email);
+CREATE TABLE followedasset (
+    id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, asset_symbol VARCHAR NOT NULL,
+    created_at DATETIME NOT NULL, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE usertoken (
+    id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, token VARCHAR NOT NULL,
+    expires_at DATETIME NOT NULL, created_at DATETIME NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE followed (
+    id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, symbol VARCHAR NOT NULL, asset_type VARCHAR NOT NULL,
+    added_at DATETIME NOT NULL, name VARCHAR, notes VARCHAR,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE investment (
+    id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, symbol VARCHAR NOT NULL, asset_type VARCHAR NOT NULL,
+    quantity FLOAT NOT NULL, price_per_unit FLOAT NOT NULL, transaction_date DATETIME NOT NULL,
+    transaction_type VARCHAR NOT NULL, source VARCHAR NOT NULL, fees FLOAT, notes VARCHAR,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+"""
+
+EXPECTED_INDEXES = {
+    "followed": {"uq_followed_user_type_symbol"},
+    "investment": {"ix_investment_user_symbol", "ix_investment_user_type"},
+    "usertoken": {"ix_usertoken_user_token", "ix_usertoken_token", "ix_usertoken_expires_at"},
+    "followedasset": {"ix_followedasset_user_id"},
+}
+
+
+def index_names(engine):
+    inspector = inspect(engine)
+    return {table: {index["name"] for index in inspector.get_indexes(table)} for table in EXPECTED_INDEXES}
+
+
+def test_baseline_database_is_upgraded(tmp_path):
+    path = tmp_path / "baseline.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    follow = "INSERT INTO followed (id, user_id, symbol, asset_type, added_at) VALUES (?, 'u1', ?, 'stock', ?)"
+    conn.executemany(follow, [("z", "AAPL", "2025-01-01"), ("a", "AAPL", "2025-02-01"),
+                              ("c", "MSFT", "2025-01-01"), ("d", "MSFT", "2025-01-01")])
+    conn.commit()
+    conn.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    assert run_migrations(engine) == [number for number, _, _ in MIGRATIONS]
+
+    assert index_names(engine) == EXPECTED_INDEXES
+    with engine.connect() as conn:
+        # 重复关注只保留最早的一条，同一时间按 id 取较小的
+        rows = conn.exec_driver_sql("SELECT id, symbol FROM followed ORDER BY id").fetchall()
+        versions = conn.exec_driver_sql("SELECT version FROM schema_version ORDER BY version").fetchall()
+    assert rows == [("c", "MSFT"), ("z", "AAPL")]
+    assert [v for (v,) in versions] == [1, 2, 3]
+
+    # 已是最新版本时不再执行任何迁移
+    assert run_migrations(engine) == []
+
+
+def test_fresh_database_matches_upgraded_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    run_migrations(engine)
+    assert index_names(engine) == EXPECTED_INDEXES
+
+
+def test_fresh_database_matches_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    run_migrations(engine)
+    inspector = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        columns = {c["name"]: c["nullable"] for c in inspector.get_columns(table.name)}
+        assert columns == {c.name: c.nullable for c in table.columns}, table.name
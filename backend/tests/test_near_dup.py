@@ -0,0 +1,42 @@
+# backend/tests/test_near_dup.py
+
+from backend.tools.near_dup import NearDuplicateIndex, MinHasher, similarity, dedupe_news
+from backend.tools.news_store import normalize_yfinance
+
+
+STORY = (
+    "Apple beats quarterly earnings estimates as iPhone sales jump",
+    "Apple reported revenue of $94.8 billion for the quarter, ahead of analyst expectations, "
+    "driven by strong iPhone demand in China and growth in services.",
+)
+
+
+def test_syndicated_copies_are_flagged():
+    index = NearDuplicateIndex()
+    assert index.add("yahoo", " ".join(STORY)) is None
+    # 转载：标题改写了几个词、标点不同
+    rewritten = (
+        "Apple Beats Quarterly Earnings Estimates, iPhone Sales Jump - Reuters "
+        + STORY[1]
+    )
+    assert index.add("eodhd", rewritten) == "yahoo"
+    assert index.add("other", "Fed holds interest rates steady and signals two cuts later this year") is None
+    assert len(index) == 2
+
+
+def test_signatures_are_deterministic_and_estimate_jaccard():
+    a, b = MinHasher(), MinHasher()
+    text = " ".join(STORY)
+    assert similarity(a.signature(text), b.signature(text)) == 1.0
+    assert similarity(a.signature(text), a.signature("Tesla recalls vehicles over seat belt warning")) < 0.2
+    assert a.signature("") is None
+
+
+def test_dedupe_news_keeps_first_of_each_story():
+    items = [
+        {"title": STORY[0], "summary": STORY[1], "link": "https://finance.yahoo.com/a", "providerPublishTime": 3},
+        {"title": STORY[0] + " (updated)", "summary": STORY[1], "link": "https://eodhd.com/b", "providerPublishTime": 2},
+        {"title": "Microsoft unveils new AI chips", "summary": "", "link": "https://x.com/c", "providerPublishTime": 1},
+    ]
+    records = [normalize_yfinance(item) for item in items]
+    assert [r.url for r in dedupe_news(records)] == ["https://finance.yahoo.com/a", "https://x.com/c"]
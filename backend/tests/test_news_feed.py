@@ -0,0 +1,33 @@
+# backend/tests/test_news_feed.py
+
+import time
+import asyncio
+from backend.tools import news_utils
+
+
+class FakeTicker:
+    delays = {"SPY": 0.2, "QQQ": 0.2, "DIA": 0.2, "IWM": 2.0}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def get_news(self, count=10):
+        time.sleep(self.delays[self.symbol])
+        return [
+            {"title": f"{self.symbol} headline", "link": f"https://news/{self.symbol}", "providerPublishTime": 1700000000},
+            {"title": "shared headline", "link": "https://news/shared", "providerPublishTime": 1700000100},
+        ][:count]
+
+
+def test_feed_sources_are_fetched_concurrently_with_timeout(monkeypatch):
+    monkeypatch.setattr(news_utils.yf, "Ticker", FakeTicker)
+
+    start = time.monotonic()
+    news = asyncio.run(news_utils.fetch_feed_records(["SPY", "QQQ", "DIA", "IWM"], count=2, timeout=0.5))
+    elapsed = time.monotonic() - start
+
+    # 三个 0.2s 的源并发完成，2s 的源在 0.5s 超时，不会拖慢整体
+    assert elapsed < 1.0
+    titles = [record.title for record in news]
+    assert sorted(titles) == ["DIA headline", "QQQ headline", "SPY headline", "shared headline"]
+    assert all(record.related_symbol in ("SPY", "QQQ", "DIA") for record in news)
@@ -0,0 +1,147 @@
+# backend/tests/test_news_store.py
+
+import time
+import hashlib
+import asyncio
+from functools import partial
+from backend.tools import news_utils
+from backend.tools.news_store import NewsStore, normalize_eodhd, normalize_yfinance, record_to_dict
+
+
+def yf_item(title, url, ts):
+    return {"title": title, "link": url, "providerPublishTime": ts, "publisher": "Reuters"}
+
+
+def test_normalizers_share_one_record_type():
+    old = normalize_yfinance(yf_item("Apple beats", "https://www.example.com/a?utm=1", 1700000000), related_symbol="AAPL")
+    new = normalize_yfinance({"content": {
+        "title": "Apple beats", "summary": "s", "pubDate": "2023-11-14T22:13:20Z",
+        "canonicalUrl": {"url": "https://example.com/a/"}, "provider": {"displayName": "Reuters"},
+    }})
+    eodhd = normalize_eodhd({"title": "Apple beats", "link": "http://example.com/a", "date": "2023-11-14T22:13:20+00:00",
+                             "symbols": ["AAPL.US", "MSFT.US"], "sentiment": {"polarity": 0.5}})
+
+    # 同一篇文章的不同链接形式得到相同的键
+    assert old.id == new.id == eodhd.id
+    assert old.published_ts == new.published_ts == eodhd.published_ts == 1700000000
+    assert eodhd.symbols == ("AAPL", "MSFT")
+    assert normalize_eodhd({"title": "no date"}) is None
+
+    item = record_to_dict(eodhd, related_symbol="AAPL")
+    assert set(item) == {"title", "description", "url", "source", "publishedAt", "published_at",
+                         "time_ago", "thumbnail", "sentiment", "relatedSymbol"}
+    assert item["relatedSymbol"] == "AAPL"
+
+
+NOW = int(time.time()) - 86400
+
+
+def test_store_dedupes_and_queries_by_symbol(tmp_path):
+    store = NewsStore(path=str(tmp_path / "news.db"))
+    aapl = [normalize_yfinance(yf_item(f"a{i}", f"https://x.com/a{i}", NOW + i), related_symbol="AAPL") for i in range(5)]
+    shared = normalize_yfinance(yf_item("both", "https://x.com/both", NOW + 2000), related_symbol="AAPL", symbols=("MSFT",))
+    msft = [normalize_yfinance(yf_item(f"m{i}", f"https://x.com/m{i}", NOW + 1500 + i), related_symbol="MSFT") for i in range(3)]
+
+    assert store.add("symbol:AAPL", aapl + [shared]) == 6
+    assert store.add("symbol:MSFT", msft + [shared]) == 3  # 共享文章只存一份
+
+    rows = store.for_symbols(["AAPL", "MSFT"], 4)
+    assert [record.title for record, _ in rows] == ["both", "m2", "m1", "m0"]
+    assert [symbol for _, symbol in rows] == ["AAPL", "MSFT", "MSFT", "MSFT"]
+    assert [r.title for r, _ in store.for_symbols(["AAPL"], 2)] == ["both", "a4"]
+
+    # 超过保留期的文章在入库时被清理
+    store._last_prune = 0
+    store.retention_seconds = 0
+    store.add(None, [])
+    assert store.for_symbols(["AAPL", "MSFT"], 10) == []
+
+    fresh, since = store.feed_state("symbol:AAPL")
+    assert fresh and since == NOW + 2000
+    assert store.feed_state("symbol:NVDA") == (False, None)
+
+
+def test_ingest_fetches_only_when_stale(tmp_path, monkeypatch):
+    store = NewsStore(path=str(tmp_path / "news.db"), min_refresh=60)
+    monkeypatch.setattr(news_utils, "news_store", store)
+    calls = []
+
+    async def fetch(since):
+        calls.append(since)
+        ts = NOW + len(calls)
+        return [normalize_yfinance(yf_item(f"t{ts}", f"https://x.com/{ts}", ts), related_symbol="AAPL")]
+
+    async def main():
+        first = await news_utils.ingest_feed("symbol:AAPL", fetch)
+        second = await news_utils.ingest_feed("symbol:AAPL", fetch)
+        store.min_refresh = 0
+        third = await news_utils.ingest_feed("symbol:AAPL", fetch)
+        return first, second, third
+
+    assert asyncio.run(main()) == (1, 0, 1)
+    # 第二次在最小刷新间隔内不访问上游；第三次从上次最新文章时间增量拉取
+    assert calls == [None, NOW + 1]
+
+
+def test_failed_fetch_does_not_mark_feed_fresh(tmp_path, monkeypatch):
+    store = NewsStore(path=str(tmp_path / "news.db"), min_refresh=60)
+    monkeypatch.setattr(news_utils, "news_store", store)
+    monkeypatch.setattr(news_utils, "EODHD_API_KEY", None)
+
+    async def failing_source(symbol, count, timeout):
+        return symbol, None
+
+    monkeypatch.setattr(news_utils, "_fetch_feed_source", failing_source)
+    assert asyncio.run(news_utils.ingest_feed("symbol:AAPL", partial(news_utils._fetch_symbol_records, "AAPL"))) == 0
+    assert store.feed_state("symbol:AAPL") == (False, None)
+
+    # 成功但没有新文章时记录刷新时间
+    async def empty_source(symbol, count, timeout):
+        return symbol, []
+
+    monkeypatch.setattr(news_utils, "_fetch_feed_source", empty_source)
+    asyncio.run(news_utils.ingest_feed("symbol:AAPL", partial(news_utils._fetch_symbol_records, "AAPL")))
+    assert store.feed_state("symbol:AAPL") == (True, None)
+
+
+def test_market_feed_without_symbols_is_empty(monkeypatch):
+    monkeypatch.setattr(news_utils, "EODHD_API_KEY", None)
+    monkeypatch.setattr(news_utils, "NEWS_FEED_SYMBOLS", [])
+    assert asyncio.run(news_utils._fetch_market_records(None)) == []
+
+
+def test_eodhd_symbol_news_requires_api_key(monkeypatch):
+    monkeypatch.setattr(news_utils, "EODHD_API_KEY", None)
+    assert asyncio.run(news_utils.get_stock_related_news_EODHO.__wrapped__("AAPL", 5)) == []
+
+
+def test_portfolio_news_merges_shared_per_symbol_caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_utils, "news_store", NewsStore(path=str(tmp_path / "news.db")))
+    calls = []
+
+    def title(symbol, i):
+        # 互不相似的标题，避免被近似去重合并
+        return f"{symbol} {hashlib.sha256(f'{symbol}{i}'.encode()).hexdigest()}"
+
+    async def fetch_symbol(symbol, since):
+        calls.append(symbol)
+        items = [yf_item(title(symbol, i), f"https://x.com/{symbol}/{i}", NOW + i * 10 + len(symbol))
+                 for i in range(30)]
+        items.append(yf_item("joint venture announced", "https://x.com/joint", NOW + 1000))
+        return [normalize_yfinance(item, related_symbol=symbol) for item in items]
+
+    monkeypatch.setattr(news_utils, "_fetch_symbol_records", fetch_symbol)
+
+    async def main():
+        first = await news_utils.get_portfolio_news(["PFA", "PFBB"], 3)
+        second = await news_utils.get_portfolio_news(["PFA", "PFCCC"], 25)
+        return first, second
+
+    first, second = asyncio.run(main())
+    # 每个代码只向上游拉取一次，两个组合共享 PFA 的缓存
+    assert sorted(calls) == ["PFA", "PFBB", "PFCCC"]
+    assert [n["title"] for n in first] == ["joint venture announced", title("PFBB", 29), title("PFA", 29)]
+    assert len(second) == 25
+    published = [n["publishedAt"] for n in second]
+    assert published == sorted(published, reverse=True)
+    assert sum(n["title"] == "joint venture announced" for n in second) == 1
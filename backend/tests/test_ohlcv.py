@@ -0,0 +1,43 @@
+# backend/tests/test_ohlcv.py
+
+import numpy as np
+import pandas as pd
+from backend.tools.ohlcv import frame_to_columns, frame_to_records
+
+
+def make_history(rows=500):
+    index = pd.date_range("2020-01-01", periods=rows, freq="D", tz="America/New_York")
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    return pd.DataFrame({
+        "Open": close + rng.random(rows),
+        "High": close + 2,
+        "Low": close - 2,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, rows).astype(float),
+    }, index=index)
+
+
+def test_records_match_row_by_row_conversion():
+    hist = make_history()
+    expected = [
+        {
+            "date": index.strftime('%Y-%m-%d %H:%M:%S'),
+            "open": round(row['Open'], 2),
+            "high": round(row['High'], 2),
+            "low": round(row['Low'], 2),
+            "close": round(row['Close'], 2),
+            "volume": int(row['Volume']),
+        }
+        for index, row in hist.iterrows()
+    ]
+    assert frame_to_records(hist) == expected
+
+
+def test_columnar_shape():
+    hist = make_history(3)
+    columns = frame_to_columns(hist)
+    assert list(columns) == ["date", "open", "high", "low", "close", "volume"]
+    assert all(len(values) == 3 for values in columns.values())
+    assert columns["date"][0] == "2020-01-01 00:00:00"
+    assert isinstance(columns["volume"][0], int)
@@ -0,0 +1,121 @@
+# backend/tests/test_portfolio_math.py
+
+from datetime import datetime
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from backend.tools.portfolio_math import (
+    transactions_frame, compute_positions, value_positions, summarize_positions, positions_to_records,
+    equity_curve, performance_metrics,
+)
+
+
+def tx(symbol, kind, quantity, price, day, asset_type="stock", fees=0.0):
+    return SimpleNamespace(
+        symbol=symbol, asset_type=asset_type, quantity=quantity, price_per_unit=price,
+        fees=fees, transaction_type=kind, transaction_date=datetime(2025, 1, day),
+    )
+
+
+def test_positions_are_aggregated_per_symbol():
+    investments = [
+        tx("AAPL", "buy", 10, 100.0, 1, fees=1.0),
+        tx("AAPL", "buy", 10, 120.0, 2),
+        tx("AAPL", "sell", 5, 130.0, 3, fees=1.0),
+        tx("btc", "buy", 0.5, 40000.0, 1, asset_type="crypto"),
+    ]
+    positions = compute_positions(transactions_frame(investments)).set_index("symbol")
+
+    aapl = positions.loc["AAPL"]
+    assert aapl["quantity"] == 15
+    assert aapl["avg_cost"] == pytest.approx(110.0)
+    assert aapl["cost_basis"] == pytest.approx(1650.0)
+    assert aapl["realized_pnl"] == pytest.approx(5 * (130.0 - 110.0))
+    assert aapl["fees"] == 2.0
+    # 加密货币代码统一为行情代码
+    assert positions.loc["BTC-USD", "quantity"] == 0.5
+
+
+def test_valuation_and_summary():
+    investments = [tx("AAPL", "buy", 10, 100.0, 1), tx("MSFT", "buy", 1, 300.0, 1)]
+    positions = compute_positions(transactions_frame(investments))
+    valued = value_positions(positions, {"AAPL": 110.0})
+
+    summary = summarize_positions(valued)
+    assert summary["market_value"] == 1100.0
+    assert summary["unrealized_pnl"] == 100.0
+    assert summary["unpriced_symbols"] == ["MSFT"]
+
+    records = {r["symbol"]: r for r in positions_to_records(valued)}
+    assert records["MSFT"]["price"] is None
+    assert records["AAPL"]["unrealized_pnl_percent"] == 10.0
+
+
+def test_equity_curve_is_time_weighted():
+    dates = pd.DatetimeIndex(["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-06"])
+    prices = pd.DataFrame({"AAPL": [100.0, 110.0, 99.0, 121.0]}, index=dates)
+    investments = [
+        tx("AAPL", "buy", 10, 100.0, 1),
+        tx("AAPL", "buy", 10, 99.0, 3),   # 追加资金不应改变收益率
+        tx("AAPL", "buy", 5, 105.0, 4),   # 周末交易归入下一个交易日
+    ]
+    curve = equity_curve(transactions_frame(investments), prices)
+
+    assert curve["value"].tolist() == pytest.approx([1000.0, 1100.0, 1980.0, 25 * 121.0])
+    assert curve["net_flow"].tolist() == pytest.approx([1000.0, 0.0, 990.0, 525.0])
+    # 前三天就是价格本身的收益：100 -> 110 -> 99
+    assert curve["daily_return"].tolist()[:3] == pytest.approx([0.0, 0.1, -0.1])
+    assert curve["drawdown"].min() == pytest.approx(-0.1)
+
+    metrics = performance_metrics(curve)
+    assert metrics["end_value"] == pytest.approx(3025.0)
+    assert metrics["net_flows"] == pytest.approx(2515.0)
+    assert metrics["max_drawdown"] == pytest.approx(-0.1)
+    assert metrics["volatility"] > 0
+
+
+def test_equity_curve_ignores_flows_before_range():
+    dates = pd.DatetimeIndex(["2025-01-02", "2025-01-03"])
+    prices = pd.DataFrame({"AAPL": [100.0, 90.0]}, index=dates)
+    curve = equity_curve(transactions_frame([tx("AAPL", "buy", 10, 80.0, 1)]), prices)
+
+    assert curve["net_flow"].tolist() == [0.0, 0.0]
+    assert curve["twr"].iloc[-1] == pytest.approx(-0.1)
+
+
+def test_cost_basis_follows_trade_order():
+    investments = [
+        tx("AAPL", "buy", 10, 100.0, 1),
+        tx("AAPL", "sell", 10, 150.0, 2),
+        tx("AAPL", "buy", 10, 200.0, 3),
+    ]
+    aapl = compute_positions(transactions_frame(investments)).set_index("symbol").loc["AAPL"]
+
+    # 清仓后重新买入，平均成本从新的买入价开始计算
+    assert aapl["realized_pnl"] == pytest.approx(500.0)
+    assert aapl["avg_cost"] == pytest.approx(200.0)
+    assert aapl["cost_basis"] == pytest.approx(2000.0)
+    assert aapl["quantity"] == 10
+    assert aapl["oversold_quantity"] == 0
+
+
+def test_oversell_is_flagged_instead_of_going_negative():
+    investments = [tx("AAPL", "buy", 5, 100.0, 1), tx("AAPL", "sell", 8, 120.0, 2)]
+    positions = compute_positions(transactions_frame(investments))
+    aapl = positions.set_index("symbol").loc["AAPL"]
+
+    assert aapl["quantity"] == 0
+    assert aapl["oversold_quantity"] == 3
+    assert aapl["realized_pnl"] == pytest.approx(5 * 20.0)
+    assert summarize_positions(value_positions(positions, {}))["oversold_symbols"] == ["AAPL"]
+
+
+def test_oversold_history_does_not_go_negative_in_equity_curve():
+    investments = [tx("AAPL", "buy", 5, 100.0, 1), tx("AAPL", "sell", 8, 120.0, 2), tx("AAPL", "buy", 2, 100.0, 3)]
+    dates = pd.date_range("2025-01-01", periods=3)
+    prices = pd.DataFrame({"AAPL": [100.0, 120.0, 100.0]}, index=dates)
+    curve = equity_curve(transactions_frame(investments), prices)
+
+    # 与 compute_positions 一致：超卖部分不计入，最终持仓 2 股
+    assert list(curve["value"]) == pytest.approx([500.0, 0.0, 200.0])
+    assert compute_positions(transactions_frame(investments))["quantity"].iloc[0] == 2
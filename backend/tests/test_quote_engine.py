@@ -0,0 +1,68 @@
+# backend/tests/test_quote_engine.py
+
+import asyncio
+import numpy as np
+import pandas as pd
+from backend.tools import quote_engine
+from backend.tools.quote_engine import QuoteEngine, quote_frame, split_quotes
+
+
+def make_frame(symbols, rows=3):
+    """构造与 yf.download(group_by="column") 相同结构的批量 K 线"""
+    index = pd.date_range("2025-04-21 09:30", periods=rows, freq="5min")
+    data = {}
+    for i, symbol in enumerate(symbols):
+        base = 100.0 * (i + 1)
+        data[("Open", symbol)] = base + np.arange(rows)
+        data[("High", symbol)] = base + np.arange(rows) + 2
+        data[("Low", symbol)] = base + np.arange(rows) - 2
+        data[("Close", symbol)] = base + np.arange(rows) + 1
+        data[("Volume", symbol)] = np.full(rows, 10.0 * (i + 1))
+    return pd.DataFrame(data, index=index)
+
+
+def test_quote_frame_is_split_per_symbol():
+    frame = make_frame(["AAPL", "MSFT"])
+    quotes = quote_frame(frame, ["AAPL", "MSFT"])
+
+    assert list(quotes.index) == ["AAPL", "MSFT"]
+    assert quotes.loc["AAPL", "open"] == 100.0
+    assert quotes.loc["AAPL", "close"] == 103.0
+    assert quotes.loc["AAPL", "high"] == 104.0
+    assert quotes.loc["AAPL", "low"] == 98.0
+    assert quotes.loc["MSFT", "volume"] == 60.0
+    assert quotes.loc["MSFT", "change"] == 3.0
+    assert round(quotes.loc["MSFT", "change_percent"], 2) == 1.5
+
+
+def test_split_quotes_skips_symbols_without_data():
+    frame = make_frame(["AAPL", "MSFT"])
+    frame[("Close", "MSFT")] = np.nan
+    quotes = split_quotes(frame, ["AAPL", "MSFT", "NVDA"], with_closes=True)
+
+    assert set(quotes) == {"AAPL"}
+    assert quotes["AAPL"]["closes"] == [101.0, 102.0, 103.0]
+
+
+def test_concurrent_requests_share_one_download(monkeypatch):
+    calls = []
+
+    def fake_download(symbols, period="1d", interval="1d"):
+        calls.append(list(symbols))
+        return make_frame(symbols)
+
+    monkeypatch.setattr(quote_engine, "download_bars", fake_download)
+    engine = QuoteEngine(batch_window=0.01)
+
+    async def main():
+        return await asyncio.gather(
+            engine.get_quotes(["AAPL"]),
+            engine.get_quotes(["MSFT"]),
+            engine.get_quotes(["AAPL", "NVDA"]),
+        )
+
+    first, second, third = asyncio.run(main())
+    assert calls == [["AAPL", "MSFT", "NVDA"]]
+    assert set(first) == {"AAPL"}
+    assert set(second) == {"MSFT"}
+    assert set(third) == {"AAPL", "NVDA"}
@@ -0,0 +1,148 @@
+# backend/tests/test_quote_hub.py
+
+import asyncio
+import pytest
+from backend.tools.quote_hub import QuoteHub, HubFull
+
+
+def test_one_poller_per_symbol_and_delta_updates():
+    calls = []
+    prices = {"AAPL": [100.0, 100.0, 101.0]}
+
+    async def fetch(symbol):
+        calls.append(symbol)
+        price = prices[symbol].pop(0) if len(prices[symbol]) > 1 else prices[symbol][0]
+        return {"price": price, "volume": 10}
+
+    async def main():
+        hub = QuoteHub(fetch=fetch, poll_interval=0.02)
+        first = hub.subscribe(["AAPL"])
+        second = hub.subscribe(["AAPL"])
+
+        snapshot = await first.next_batch(timeout=1)
+        assert snapshot == {"AAPL": {"price": 100.0, "volume": 10}}
+        assert await second.next_batch(timeout=1) == snapshot
+
+        # 第二次轮询价格未变，不推送；第三次只推送变化的字段
+        update = await first.next_batch(timeout=1)
+        assert update == {"AAPL": {"price": 101.0}}
+
+        stats = hub.stats()
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        await asyncio.sleep(0)
+        return stats, hub.stats()
+
+    stats, after = asyncio.run(main())
+    assert stats == {"symbols": 1, "subscriptions": 2, "rejected": 0}
+    assert after == {"symbols": 0, "subscriptions": 0, "rejected": 0}
+
+
+def test_slow_subscriber_gets_coalesced_updates():
+    prices = [1.0, 2.0, 3.0]
+
+    async def fetch(symbol):
+        price = prices.pop(0) if len(prices) > 1 else prices[0]
+        return {"price": price, "volume": int(price)}
+
+    async def main():
+        hub = QuoteHub(fetch=fetch, poll_interval=0.02)
+        subscription = hub.subscribe(["AAPL"])
+        # 不消费，让三次轮询的更新在订阅中累积
+        await asyncio.sleep(0.15)
+        batch = await subscription.next_batch(timeout=1)
+        hub.unsubscribe(subscription)
+        return batch, subscription.coalesced
+
+    batch, coalesced = asyncio.run(main())
+    assert batch == {"AAPL": {"price": 3.0, "volume": 3}}
+    assert coalesced == 2
+
+
+def test_global_symbol_and_subscription_caps():
+    async def fetch(symbol):
+        return {"price": 1.0}
+
+    async def main():
+        hub = QuoteHub(fetch=fetch, poll_interval=60, max_symbols=3, max_subscriptions=2)
+        first = hub.subscribe(["AAPL", "MSFT"])
+        # 已在轮询的代码不占用新的名额
+        with pytest.raises(HubFull):
+            hub.subscribe(["NVDA", "TSLA"])
+        second = hub.subscribe(["AAPL", "NVDA"])
+        with pytest.raises(HubFull):
+            hub.subscribe(["AAPL"])
+        full = hub.stats()
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(first)  # 重复退订不影响计数
+        third = hub.subscribe(["TSLA"])
+        after = hub.stats()
+        hub.unsubscribe(second)
+        hub.unsubscribe(third)
+        return full, after, hub.stats()
+
+    full, after, closed = asyncio.run(main())
+    assert full == {"symbols": 3, "subscriptions": 2, "rejected": 2}
+    assert after == {"symbols": 3, "subscriptions": 2, "rejected": 2}
+    assert closed == {"symbols": 0, "subscriptions": 0, "rejected": 2}
+
+
+def test_stream_rejects_empty_symbols_and_full_hub(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from service import pages_routes
+
+    app = FastAPI()
+    app.include_router(pages_routes.router)
+    client = TestClient(app)
+
+    assert client.get("/stream/quotes", params={"symbols": ","}).status_code == 400
+    assert client.get("/stream/quotes", params={"symbols": ""}).status_code == 400
+
+    monkeypatch.setattr(pages_routes.quote_hub, "max_symbols", 0)
+    response = client.get("/stream/quotes", params={"symbols": "AAPL"})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_stream_rejects_too_many_symbols_and_reports_late_hub_full(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from service import pages_routes
+    # 路由以 backend/ 为根导入，与本文件导入的 backend.tools.quote_hub 不是同一个模块对象
+    from tools import quote_hub as hub_module
+
+    app = FastAPI()
+    app.include_router(pages_routes.router)
+    client = TestClient(app)
+
+    monkeypatch.setattr(hub_module, "STREAM_MAX_SYMBOLS", 2)
+    response = client.get("/stream/quotes", params={"symbols": "AAPL,MSFT,NVDA"})
+    assert response.status_code == 400
+
+    # 容量检查通过后才被占满：推送一条 error 事件再结束
+    def full(symbols):
+        raise pages_routes.HubFull("full")
+
+    monkeypatch.setattr(pages_routes.quote_hub, "subscribe", full)
+    response = client.get("/stream/quotes", params={"symbols": "AAPL"})
+    assert response.status_code == 200
+    assert response.text.startswith("event: error\n")
+
+
+def test_stop_cancels_all_pollers():
+    async def fetch(symbol):
+        return {"price": 1.0}
+
+    async def main():
+        hub = QuoteHub(fetch=fetch, poll_interval=60)
+        subscription = hub.subscribe(["AAPL", "MSFT"])
+        pollers = list(hub._pollers.values())
+        await hub.stop()
+        hub.unsubscribe(subscription)
+        return pollers, hub.stats()
+
+    pollers, stats = asyncio.run(main())
+    assert all(poller.cancelled() for poller in pollers)
+    assert stats == {"symbols": 0, "subscriptions": 0, "rejected": 0}
@@ -0,0 +1,50 @@
+# backend/tests/test_refresher.py
+
+import asyncio
+from datetime import datetime
+import pytz
+from backend.tools.cache import cache_result, cache_store
+from backend.tools.refresher import MarketDataRefresher, RefreshJob, is_us_market_open
+
+ET = pytz.timezone("US/Eastern")
+
+
+def test_us_market_hours():
+    assert is_us_market_open(ET.localize(datetime(2025, 4, 22, 10, 0)))      # 周二盘中
+    assert not is_us_market_open(ET.localize(datetime(2025, 4, 22, 8, 0)))   # 盘前
+    assert not is_us_market_open(ET.localize(datetime(2025, 4, 22, 16, 0)))  # 收盘
+    assert not is_us_market_open(ET.localize(datetime(2025, 4, 26, 12, 0)))  # 周六
+
+
+def test_equity_jobs_slow_down_when_market_closed():
+    async def noop():
+        return None
+
+    equity = RefreshJob("equity", noop, market="equity", open_interval=60, closed_interval=1800)
+    crypto = RefreshJob("crypto", noop, market="crypto", open_interval=120)
+    assert equity.interval(True) == 60
+    assert equity.interval(False) == 1800
+    assert crypto.interval(False) == 120
+
+
+def test_refresher_prewarms_cache():
+    calls = []
+
+    @cache_result(expire_seconds=60)
+    async def get_top(limit=5):
+        calls.append(limit)
+        return list(range(limit))
+
+    refresher = MarketDataRefresher(jobs=[RefreshJob("top", get_top, {"limit": 3}, market="crypto", open_interval=60)])
+
+    async def main():
+        due = await refresher.run_due_jobs()
+        assert len(due) == 1
+        # 刚运行过的任务不会立即再次执行
+        assert await refresher.run_due_jobs() == []
+        # 用户请求直接命中预热好的缓存
+        return await get_top(limit=3)
+
+    cache_store.clear()
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert calls == [3]
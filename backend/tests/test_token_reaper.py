@@ -0,0 +1,47 @@
+# backend/tests/test_token_reaper.py
+
+import asyncio
+from datetime import timedelta
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from data import build_engine, build_async_engine
+from migrations import run_migrations
+from models.token import UserToken
+from service.token_reaper import TokenReaper, utc_now
+
+
+def test_reaper_deletes_only_expired_tokens_in_batches(tmp_path):
+    url = f"sqlite:///{tmp_path / 'tokens.db'}"
+    engine = build_engine(url)
+    run_migrations(engine)
+    now = utc_now()
+    with Session(engine) as session:
+        for i in range(5):
+            session.add(UserToken(user_id="u1", token=f"expired-{i}", expires_at=now - timedelta(minutes=i + 1)))
+        for i in range(2):
+            session.add(UserToken(user_id="u1", token=f"valid-{i}", expires_at=now + timedelta(hours=1)))
+        session.commit()
+
+    async_engine = build_async_engine(url)
+    deletes = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("DELETE"):
+            deletes.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    reaper = TokenReaper(engine=async_engine, batch_size=2)
+
+    async def main():
+        deleted = await reaper.reap(now)
+        await async_engine.dispose()
+        return deleted
+
+    assert asyncio.run(main()) == 5
+    # 5 行按每批 2 行删除：2 + 2 + 1
+    assert len(deletes) == 3
+    with Session(engine) as session:
+        remaining = session.exec(select(UserToken.token)).all()
+    assert sorted(remaining) == ["valid-0", "valid-1"]
+    assert reaper.deleted == 5 and reaper.runs == 1
@@ -0,0 +1,47 @@
+# backend/tests/test_user_portfolio.py
+
+import uuid
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from data import create_db_and_tables
+from service.auth import auth_router
+from service.user_portfolio import portfolio_router
+from tools.portfolio_performance import get_portfolio_performance
+
+
+@pytest.fixture(scope="module")
+def headers():
+    create_db_and_tables()
+    app = FastAPI()
+    app.include_router(auth_router, prefix="/auth")
+    app.include_router(portfolio_router, prefix="/portfolio")
+    with TestClient(app) as client:
+        email = f"{uuid.uuid4().hex[:10]}@example.com"
+        client.post("/auth/register", json={"email": email, "username": "tester", "password": "secret-pw"})
+        token = client.post("/auth/login", data={"username": email, "password": "secret-pw"}).json()["access_token"]
+        yield client, {"Authorization": f"Bearer {token}"}
+
+
+def trade(symbol, transaction_type, quantity, day, asset_type="crypto"):
+    return {"symbol": symbol, "asset_type": asset_type, "quantity": quantity, "price_per_unit": 100.0,
+            "transaction_date": f"2025-01-{day:02d}T00:00:00Z", "transaction_type": transaction_type}
+
+
+def test_oversell_check_matches_quote_symbol(headers):
+    client, auth = headers
+    assert client.post("/portfolio/investments", json=trade("btc", "buy", 2, 1), headers=auth).status_code == 200
+
+    # "BTC-USD" 与 "btc" 是同一个持仓，可以卖出
+    response = client.post("/portfolio/investments", json=trade("BTC-USD", "sell", 1, 2), headers=auth)
+    assert response.status_code == 200
+    response = client.post("/portfolio/investments", json=trade("BTC", "sell", 2, 3), headers=auth)
+    assert response.status_code == 400
+
+
+def test_empty_performance_has_the_same_keys():
+    result = asyncio.run(get_portfolio_performance("nobody", [], "1y"))
+    assert set(result) == {"period", "start", "end", "metrics", "missing_prices", "series"}
+    assert result["start"] is None and result["missing_prices"] == []
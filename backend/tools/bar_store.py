@@ -0,0 +1,255 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BAR_STORE_PATH = os.getenv("BAR_STORE_PATH", os.path.join(BACKEND_DIR, "models", "bars.db"))
+# 两次向上游补尾部数据的最小间隔（秒）
+BAR_STORE_MIN_REFRESH = float(os.getenv("BAR_STORE_MIN_REFRESH", 300))
+# 复权价格会因分红/拆股改变历史 K 线，超过该天数后整段重新拉取一次
+BAR_STORE_FULL_REFRESH_DAYS = float(os.getenv("BAR_STORE_FULL_REFRESH_DAYS", 7))
+
+# 只持久化日线及以上周期；分钟线上游本身只保留几天，直接透传
+STORED_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+# period -> 起始时间偏移；1d/5d 按最近 N 个交易日计算
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+PERIOD_DAYS = {"1d": 1, "5d": 5}
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bar_coverage (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start_ts INTEGER,
+    full_history INTEGER NOT NULL DEFAULT 0,
+    tz TEXT,
+    fetched_at REAL NOT NULL,
+    full_fetched_at REAL NOT NULL,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+
+def _yf_fetch(symbol, interval, period=None, start=None):
+    ticker = yf.Ticker(symbol)
+    if start is not None:
+        return ticker.history(start=start, interval=interval)
+    return ticker.history(period=period, interval=interval)
+
+
+def period_start(period, now):
+    """返回 period 对应的起始时间；max 返回 None，1d/5d 返回 None（读取时按已存 K 线的日期计算）"""
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+    offset = PERIOD_OFFSETS.get(period)
+    return now - offset if offset is not None else None
+
+
+class BarStore:
+    """
+    本地持久化的 K 线库，按 (symbol, interval) 存储
+
+    - 首次请求某个范围时整段下载并写入
+    - 已覆盖的范围只向上游请求缺失的尾部（从最后一根 K 线开始，覆盖未收盘的那根）
+    - 每隔 BAR_STORE_FULL_REFRESH_DAYS 天把已覆盖的整个范围重拉一次，吸收复权带来的历史价格变化
+    """
+
+    def __init__(self, path=BAR_STORE_PATH, fetch=_yf_fetch,
+                 min_refresh=BAR_STORE_MIN_REFRESH, full_refresh_days=BAR_STORE_FULL_REFRESH_DAYS):
+        self.path = path
+        self.fetch = fetch
+        self.min_refresh = min_refresh
+        self.full_refresh_seconds = full_refresh_days * 86400
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.upstream_calls = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+        return conn
+
+    def get_history(self, symbol, period="1mo", interval="1d"):
+        """返回与 yf.Ticker.history 相同结构的 DataFrame（阻塞调用）"""
+        symbol = symbol.upper()
+        if interval not in STORED_INTERVALS:
+            return self._fetch(symbol, interval, period=period)
+
+        conn = self._connect()
+        try:
+            self._sync(conn, symbol, period, interval)
+            return self._read(conn, symbol, period, interval)
+        finally:
+            conn.close()
+
+    def _fetch(self, symbol, interval, period=None, start=None):
+        self.upstream_calls += 1
+        return self.fetch(symbol, interval, period=period, start=start)
+
+    def _sync(self, conn, symbol, period, interval):
+        coverage = conn.execute(
+            "SELECT start_ts, full_history, tz, fetched_at, full_fetched_at FROM bar_coverage "
+            "WHERE symbol = ? AND interval = ?",
+            (symbol, interval),
+        ).fetchone()
+        now = time.time()
+        tz = coverage[2] if coverage and coverage[2] else "UTC"
+        start = period_start(period, pd.Timestamp.now(tz=tz))
+
+        if coverage is None or self._needs_full_fetch(coverage, period, start, now):
+            self._full_fetch(conn, symbol, interval, period, start, coverage, tz, now)
+            return
+
+        if now - coverage[3] < self.min_refresh:
+            return
+
+        # 增量补齐：从最后一根 K 线（可能尚未收盘）开始请求
+        last_ts = conn.execute(
+            "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval)
+        ).fetchone()[0]
+        tail_start = pd.Timestamp(last_ts, unit="s", tz="UTC").tz_convert(tz).strftime("%Y-%m-%d")
+        hist = self._fetch(symbol, interval, start=tail_start)
+        with conn:
+            if not hist.empty:
+                self._upsert(conn, symbol, interval, hist)
+            conn.execute(
+                "UPDATE bar_coverage SET fetched_at = ? WHERE symbol = ? AND interval = ?",
+                (now, symbol, interval),
+            )
+
+    def _full_fetch(self, conn, symbol, interval, period, start, coverage, tz, now):
+        """
+        整段拉取并替换该代码的全部 K 线
+
+        拉取范围是本次请求与已有覆盖范围的并集：定期全量刷新时，之前更长周期
+        存下的历史 K 线也会被复权后的新价格覆盖，而不是只刷新本次请求的区间
+        """
+        full_history = period == "max" or bool(coverage and coverage[1])
+        covered_ts = coverage[0] if coverage else None
+        if start is not None and (covered_ts is None or start.timestamp() < covered_ts):
+            covered_ts = None  # 本次请求比已有覆盖更早，按 period 拉取
+        if full_history:
+            hist = self._fetch(symbol, interval, period="max")
+        elif covered_ts is not None:
+            fetch_from = pd.Timestamp(covered_ts, unit="s", tz="UTC").tz_convert(tz).strftime("%Y-%m-%d")
+            hist = self._fetch(symbol, interval, start=fetch_from)
+        else:
+            hist = self._fetch(symbol, interval, period=period)
+        if hist.empty:
+            return
+
+        covered_from = hist.index[0]
+        if start is not None and not full_history:
+            covered_from = min(start, covered_from)
+        if covered_ts is not None:
+            covered_from = min(covered_from, pd.Timestamp(covered_ts, unit="s", tz="UTC"))
+        with conn:
+            # 拉取范围覆盖了所有已存 K 线，先清空再写入，不留下未复权的旧价格
+            conn.execute("DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval))
+            self._upsert(conn, symbol, interval, hist)
+            conn.execute(
+                "INSERT OR REPLACE INTO bar_coverage "
+                "(symbol, interval, start_ts, full_history, tz, fetched_at, full_fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (symbol, interval, int(covered_from.timestamp()), int(full_history),
+                 str(hist.index.tz or "UTC"), now, now),
+            )
+
+    def _needs_full_fetch(self, coverage, period, start, now):
+        start_ts, full_history, _, _, full_fetched_at = coverage
+        if now - full_fetched_at >= self.full_refresh_seconds:
+            return True
+        if period == "max":
+            return not full_history
+        if start is None:
+            return False  # 1d/5d：已有任意覆盖即可
+        return not full_history and start_ts > start.timestamp()
+
+    def _upsert(self, conn, symbol, interval, hist):
+        hist = hist.dropna(subset=["Close"])
+        ts = (hist.index.as_unit("ns").asi8 // 10**9).tolist()
+        values = hist[COLUMNS].astype(float).itertuples(index=False, name=None)
+        conn.executemany(
+            "INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, volume) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(symbol, interval, t, *v) for t, v in zip(ts, values)],
+        )
+
+    def _read(self, conn, symbol, period, interval):
+        tz = conn.execute(
+            "SELECT tz FROM bar_coverage WHERE symbol = ? AND interval = ?", (symbol, interval)
+        ).fetchone()
+        tz = tz[0] if tz and tz[0] else "UTC"
+
+        params = [symbol, interval]
+        query = "SELECT ts, open, high, low, close, volume FROM bars WHERE symbol = ? AND interval = ?"
+        if period in PERIOD_DAYS:
+            start_ts = self._recent_days_start(conn, symbol, interval, PERIOD_DAYS[period], tz)
+        else:
+            start = period_start(period, pd.Timestamp.now(tz=tz))
+            start_ts = int(start.timestamp()) if start is not None else None
+        if start_ts is not None:
+            query += " AND ts >= ?"
+            params.append(start_ts)
+        query += " ORDER BY ts"
+
+        rows = conn.execute(query, params).fetchall()
+        frame = pd.DataFrame(rows, columns=["ts"] + COLUMNS)
+        index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True).dt.tz_convert(tz)
+        frame.index = pd.DatetimeIndex(index, name="Date")
+        return frame
+
+    def _recent_days_start(self, conn, symbol, interval, days, tz):
+        """
+        最近 days 个交易日的起始时间戳（与 yfinance 的 1d/5d 一致，不是最近 days 根 K 线）
+
+        日线每根 K 线就是一个交易日，直接取第 days 新的 K 线；更长的周期从今天往前推
+        days 个工作日，并包含覆盖该日期的那根 K 线（例如本周的周线）
+        """
+        if interval == "1d":
+            row = conn.execute(
+                "SELECT ts FROM bars WHERE symbol = ? AND interval = ? ORDER BY ts DESC LIMIT 1 OFFSET ?",
+                (symbol, interval, days - 1),
+            ).fetchone()
+            return row[0] if row else None
+
+        today = pd.offsets.BDay().rollback(pd.Timestamp.now(tz=tz).normalize())
+        cutoff = today - pd.offsets.BDay(days - 1)
+        covering = conn.execute(
+            "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ? AND ts <= ?",
+            (symbol, interval, int(cutoff.timestamp())),
+        ).fetchone()[0]
+        return covering if covering is not None else int(cutoff.timestamp())
+
+
+# 全局共享的 K 线库
+bar_store = BarStore()
@@ -1,33 +1,502 @@
+import os
+import sys
 import time
+import asyncio
+import hashlib
+import inspect
+import zlib
+import pickle
+import threading
+from collections import OrderedDict
 from functools import wraps
 import logging
+from abc import ABC, abstractmethod
 
 logger = logging.getLogger(__name__)
 
-# 简单的内存缓存
-cache_store = {}
+# 缓存容量配置：条目数上限、字节上限（0 表示不限制）、过期清理间隔（秒）
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 2048))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 0))
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", 60))
 
-def cache_result(expire_seconds=300):  # 默认缓存5分钟
+# 缓存后端："memory"（进程内）或 "redis"（多 worker 共享）
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_CACHE_PREFIX", "tradingai:cache:")
+
+
+def _estimate_size(value):
+    """估算缓存值占用的字节数，仅在设置了字节上限时使用"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    有界的 LRU + TTL 内存缓存
+
+    - 每个条目有自己的过期时间，读取时遇到过期条目立即删除
+    - 每隔 sweep_interval 秒整体清理一次过期条目，避免冷 key 常驻内存
+    - 超过 max_entries / max_bytes 时按最近最少使用顺序淘汰
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, sweep_interval=CACHE_SWEEP_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.RLock()
+        self._last_sweep = time.monotonic()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        now = time.monotonic()
+        size = _estimate_size(value) if self.max_bytes else 0
+        with self._lock:
+            self._maybe_sweep(now)
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, now + ttl, size)
+            self.bytes += size
+            self._enforce_limits()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def purge_expired(self):
+        """删除所有已过期条目，返回删除数量"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            self._last_sweep = now
+            return len(expired)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self.purge_expired()
+
+    def _enforce_limits(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes and self.bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+
+_MISSING = object()
+
+# 全局共享的内存缓存
+cache_store = TTLCache()
+
+
+class CacheBackend(ABC):
+    """
+    cache_result 使用的缓存后端接口
+
+    所有方法都是异步的；get 未命中时返回 _MISSING
+    """
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key):
+        ...
+
+    @abstractmethod
+    async def set(self, key, value, ttl):
+        ...
+
+    @abstractmethod
+    async def delete(self, key):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+class MemoryBackend(CacheBackend):
+    """进程内后端，基于 TTLCache"""
+    name = "memory"
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else TTLCache()
+
+    async def get(self, key):
+        return self.store.get(key, _MISSING)
+
+    async def set(self, key, value, ttl):
+        self.store.set(key, value, ttl)
+
+    async def delete(self, key):
+        self.store.delete(key)
+
+    async def clear(self):
+        self.store.clear()
+
+    def stats(self):
+        return {"backend": self.name, **self.store.stats()}
+
+
+# 超过该大小的序列化结果会先压缩再写入 Redis
+_COMPRESS_THRESHOLD = 4096
+
+
+def _dumps(value):
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(blob) > _COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(blob, 1)
+    return b"p" + blob
+
+
+def _loads(data):
+    if data[:1] == b"z":
+        return pickle.loads(zlib.decompress(data[1:]))
+    return pickle.loads(data[1:])
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis 后端：多个 uvicorn worker 共享同一份缓存
+
+    - 值使用 pickle 序列化，较大的结果用 zlib 压缩
+    - 过期时间由 Redis 服务端 (PX) 负责
+    - Redis 不可用时按未命中处理，不影响请求
+    """
+    name = "redis"
+
+    def __init__(self, client=None, url=REDIS_URL, prefix=REDIS_KEY_PREFIX):
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    async def get(self, key):
+        try:
+            data = await self.client.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Redis 读取失败: {e}")
+            return _MISSING
+        if data is None:
+            self.misses += 1
+            return _MISSING
+        try:
+            value = _loads(data)
+        except Exception as e:
+            # 损坏或由不兼容版本写入的值：删除后按未命中处理
+            self.errors += 1
+            self.misses += 1
+            logger.warning(f"⚠️ Redis 缓存值无法解码，已删除 {key}: {e}")
+            await self.delete(key)
+            return _MISSING
+        self.hits += 1
+        return value
+
+    async def set(self, key, value, ttl):
+        try:
+            await self.client.set(self._key(key), _dumps(value), px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Redis 写入失败: {e}")
+
+    async def delete(self, key):
+        try:
+            await self.client.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Redis 删除失败: {e}")
+
+    async def clear(self):
+        keys = [k async for k in self.client.scan_iter(match=f"{self.prefix}*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "errors": self.errors,
+        }
+
+
+def _create_default_backend():
+    if CACHE_BACKEND == "redis":
+        logger.info(f"使用 Redis 缓存后端: {REDIS_URL}")
+        return RedisBackend()
+    return MemoryBackend(cache_store)
+
+
+_default_backend = _create_default_backend()
+
+
+def get_cache_backend():
+    return _default_backend
+
+
+def set_cache_backend(backend):
+    """替换全局默认缓存后端（未显式指定 backend 的 cache_result 都会使用它）"""
+    global _default_backend
+    _default_backend = backend
+
+
+# 正在计算中的缓存键 -> 共享的计算任务（single-flight）
+_inflight = {}
+
+# stale-while-revalidate 统计
+_swr_stats = {"stale_hits": 0, "background_refreshes": 0, "background_failures": 0}
+
+
+def _start_flight(cache_key, compute):
+    """返回该缓存键正在进行的计算任务，没有则新建一个"""
+    task = _inflight.get(cache_key)
+    if task is not None:
+        return task, False
+
+    task = asyncio.ensure_future(compute())
+    _inflight[cache_key] = task
+
+    def _done(t):
+        if _inflight.get(cache_key) is t:
+            del _inflight[cache_key]
+        # 所有等待者都已取消时，避免 "exception was never retrieved" 警告
+        if not t.cancelled():
+            t.exception()
+
+    task.add_done_callback(_done)
+    return task, True
+
+
+async def single_flight(cache_key, compute):
+    """
+    合并同一缓存键的并发未命中：只有第一个调用方真正执行计算，
+    其余调用方等待同一个任务的结果
+
+    计算失败时，本轮所有等待者都会收到同一个异常；异常不会被缓存，
+    任务结束后即从 _inflight 移除，下一次调用会重新计算
+    """
+    task, started = _start_flight(cache_key, compute)
+    if not started:
+        logger.info(f"⏳ 等待进行中的计算: {cache_key}")
+    # shield: 单个调用方被取消时不影响其他等待者和计算本身
+    return await asyncio.shield(task)
+
+
+def _revalidate_in_background(cache_key, compute):
+    """在后台刷新过期条目；已有进行中的计算时不重复发起"""
+    task, started = _start_flight(cache_key, compute)
+    if not started:
+        return
+    _swr_stats["background_refreshes"] += 1
+
+    def _log_failure(t):
+        if not t.cancelled() and t.exception() is not None:
+            _swr_stats["background_failures"] += 1
+            logger.warning(f"⚠️ 后台刷新缓存失败 {cache_key}: {t.exception()}")
+
+    task.add_done_callback(_log_failure)
+
+
+def _normalize(value):
+    """把参数转换为可稳定 repr 的结构：集合排序、字典按键排序、列表转元组"""
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(v) for v in value), key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted(((k, _normalize(v)) for k, v in value.items()), key=repr))
+    return value
+
+
+def make_key_builder(func, unordered=()):
+    """
+    为 func 生成缓存键函数
+
+    - 参数按函数签名绑定并补全默认值，f(5) 与 f(limit=5) 得到同一个键
+    - unordered 中列出的参数视为多重集合：顺序不影响键，重复元素仍然区分
+    - 归一化后的参数取 blake2b 摘要，键长度固定
+
+    签名只在装饰时解析一次；普通参数（没有 *args/**kwargs）直接按位置和默认值
+    组装，不在每次调用时执行 inspect.Signature.bind
+    """
+    signature = inspect.signature(func)
+    prefix = f"{func.__module__}.{func.__qualname__}"
+    unordered = frozenset(unordered)
+
+    params = list(signature.parameters.values())
+    names = [p.name for p in params]
+    name_set = frozenset(names)
+    positional = [p.name for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+    positional_only = frozenset(p.name for p in params if p.kind == p.POSITIONAL_ONLY)
+    defaults = {p.name: p.default for p in params if p.default is not p.empty}
+    simple = all(p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in params)
+
+    def bind(args, kwargs):
+        if simple and len(args) <= len(positional):
+            given = positional[:len(args)]
+            if kwargs.keys() <= name_set and not kwargs.keys() & positional_only and not kwargs.keys() & set(given):
+                values = dict(defaults)
+                values.update(zip(given, args))
+                values.update(kwargs)
+                if len(values) == len(names):
+                    return [(name, values[name]) for name in names]
+        # 可变参数或参数不匹配（由 bind 抛出与直接调用一致的 TypeError）
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return list(bound.arguments.items())
+
+    def build(args, kwargs):
+        parts = []
+        for name, value in bind(args, kwargs):
+            if name in unordered and isinstance(value, (list, tuple, set, frozenset)):
+                parts.append((name, tuple(sorted((_normalize(v) for v in value), key=repr))))
+            else:
+                parts.append((name, _normalize(value)))
+        digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+        return f"{prefix}:{digest}"
+
+    return build
+
+
+def cache_result(expire_seconds=300, stale_seconds=0, backend=None, unordered=()):  # 默认缓存5分钟
+    """
+    缓存异步函数的结果
+
+    参数:
+        expire_seconds: 结果的新鲜期
+        stale_seconds: 过期后的 stale-while-revalidate 窗口。窗口内直接返回旧值，
+                       同时在后台刷新；超过窗口（最大陈旧时间）后调用方需等待重新计算
+        backend: 使用的 CacheBackend，默认使用全局后端（见 CACHE_BACKEND）
+        unordered: 视为集合的参数名，参数顺序不影响缓存键
+    """
     def decorator(func):
+        build_key = make_key_builder(func, unordered)
+
+        def make_compute(cache_key, store, args, kwargs, ttl):
+            async def compute():
+                # 执行原始函数
+                result = await func(*args, **kwargs)
+
+                # 存储结果及其新鲜期截止时间，条目保留到陈旧窗口结束
+                await store.set(cache_key, (result, time.time() + ttl), ttl + stale_seconds)
+                logger.info(f"🔄 更新缓存: {func.__name__}")
+                return result
+            return compute
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # 创建缓存键
-            cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            
+            cache_key = build_key(args, kwargs)
+            store = backend or _default_backend
+            compute = make_compute(cache_key, store, args, kwargs, expire_seconds)
+
             # 检查缓存
-            if cache_key in cache_store:
-                result, timestamp = cache_store[cache_key]
-                if time.time() - timestamp < expire_seconds:
+            entry = await store.get(cache_key)
+            if entry is not _MISSING:
+                result, fresh_until = entry
+                if time.time() < fresh_until:
                     logger.info(f"✅ 使用缓存: {func.__name__}")
-                    return result
-            
-            # 执行原始函数
-            result = await func(*args, **kwargs)
-            
-            # 存储结果到缓存
-            cache_store[cache_key] = (result, time.time())
-            logger.info(f"🔄 更新缓存: {func.__name__}")
-            
-            return result
+                else:
+                    _swr_stats["stale_hits"] += 1
+                    logger.info(f"♻️ 使用过期缓存并后台刷新: {func.__name__}")
+                    _revalidate_in_background(cache_key, compute)
+                return result
+
+            return await single_flight(cache_key, compute)
+
+        async def refresh(*args, expire_seconds=None, **kwargs):
+            """
+            跳过缓存直接重新计算并写回（用于后台预热）
+
+            expire_seconds 可覆盖本次写入的新鲜期，例如刷新间隔比 TTL 更长时
+            """
+            cache_key = build_key(args, kwargs)
+            store = backend or _default_backend
+            ttl = wrapper.expire_seconds if expire_seconds is None else expire_seconds
+            return await single_flight(cache_key, make_compute(cache_key, store, args, kwargs, ttl))
+
+        wrapper.refresh = refresh
+        wrapper.expire_seconds = expire_seconds
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def get_cache_stats():
+    """返回缓存命中/未命中/淘汰等统计信息"""
+    return {**_default_backend.stats(), **_swr_stats, "inflight": len(_inflight)}
@@ -2,6 +2,7 @@ import yfinance as yf
 import logging
 import asyncio
 from .cache import cache_result
+from .quote_engine import get_quotes
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +20,10 @@ DEFAULT_CRYPTO_DATA = {
 
 async def _fetch_crypto(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1d")
+        # 同一时间的多个调用会被报价引擎合并为一次批量下载
+        quote = (await get_quotes([symbol])).get(symbol)
         
-        if hist.empty:
+        if not quote:
             logger.warning(f"⚠️ Warning: Skipping {symbol} due to empty data")
             raise ValueError(f"No data for {symbol}")
             
@@ -30,10 +31,9 @@ async def _fetch_crypto(symbol):
         name = DEFAULT_CRYPTO_DATA.get(symbol, {}).get("name", symbol)
         
         # 计算价格变化
-        latest_price = hist['Close'].iloc[-1]
-        prev_close = hist['Open'].iloc[0]
-        change = latest_price - prev_close
-        change_percent = (change / prev_close) * 100 if prev_close > 0 else 0
+        latest_price = quote['close']
+        change = quote['change']
+        change_percent = quote['change_percent']
         
         return {
             "symbol": symbol,
@@ -55,7 +55,7 @@ async def _fetch_crypto(symbol):
             "fallback": True
         }
 
-@cache_result(expire_seconds=900)  # 缓存15分钟
+@cache_result(expire_seconds=900, stale_seconds=120)  # 缓存15分钟，过期后2分钟内先返回旧值并后台刷新
 async def get_top_cryptos(limit=5):
     # 热门加密货币列表
     symbols = ["BTC-USD", "ETH-USD", "SOL-USD", "XRP-USD", "BNB-USD", "ADA-USD", "DOGE-USD"][:limit]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+
+    首尾点总是保留；中间的点分成 n_out-2 个桶，每个桶选出与
+    “上一个选中点”和“下一个桶均值点”构成三角形面积最大的点。
+    桶之间存在依赖只能逐桶处理，桶内面积计算和各桶均值都用 NumPy 向量化完成
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # 中间点 [1, n-1) 分成 n_out-2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # 每个桶的“下一个桶”均值（最后一个桶的下一个桶是末尾点），用前缀和一次算完
+    next_starts = np.append(starts[1:], n - 1)
+    next_ends = np.append(ends[1:], n)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = next_ends - next_starts
+    avg_x = (cum_x[next_ends] - cum_x[next_starts]) / counts
+    avg_y = (cum_y[next_ends] - cum_y[next_starts]) / counts
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = starts[i], ends[i]
+        area = np.abs((x[a] - avg_x[i]) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (avg_y[i] - y[a]))
+        a = s + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample_frame(hist: pd.DataFrame, points: int, column: str = "Close") -> pd.DataFrame:
+    """按收盘价形状把 K 线降采样到最多 points 行，保留被选中行的全部列"""
+    hist = hist.dropna(subset=[column])
+    if points is None or len(hist) <= points:
+        return hist
+    x = hist.index.as_unit("ns").asi8.astype(float)
+    return hist.iloc[lttb_indices(x, hist[column].to_numpy(), points)]
@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# yfinance 并发上限与单次调用超时（秒），可通过环境变量调整
+YF_MAX_WORKERS = int(os.getenv("YF_MAX_WORKERS", 16))
+YF_CALL_TIMEOUT = float(os.getenv("YF_CALL_TIMEOUT", 15))
+# bcrypt 哈希/校验的并发上限与最大排队数，超出排队上限的请求直接拒绝
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", min(4, os.cpu_count() or 1)))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", 64))
+
+
+class PoolSaturated(RuntimeError):
+    """线程池中等待执行的调用已达到 max_pending"""
+
+
+class BlockingPool:
+    """
+    有界线程池，用于在事件循环之外执行阻塞调用（yfinance 等）
+
+    - max_workers 即并发上限，超出的调用在池内排队
+    - 每次调用有超时，超时后立即向调用方抛出 asyncio.TimeoutError
+      （线程本身无法被中断，会在后台自然结束）
+    - 设置 max_pending 时，执行中 + 排队的调用数达到上限后新调用抛出 PoolSaturated；
+      超时的调用在线程真正结束前仍占用名额
+    """
+
+    def __init__(self, name, max_workers, timeout=None, max_pending=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        # 运行指标
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.active = 0
+        self.queued = 0  # 已提交、尚未开始执行
+        self.pending = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self.name,
+                    )
+        return self._executor
+
+    def _wrap(self, func, queued_at):
+        def runner():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self._total_wait += time.monotonic() - queued_at
+            try:
+                return func()
+            finally:
+                # 在工作线程中释放名额：调用方超时后线程仍在运行，名额要等线程真正结束才归还
+                with self._lock:
+                    self.active -= 1
+                    self.pending -= 1
+        return runner
+
+    def _release_if_cancelled(self, future):
+        # 尚未开始执行就被取消（超时或关闭线程池）的调用，runner 不会运行，在这里归还名额
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+                self.pending -= 1
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        """在线程池中执行 func(*args, **kwargs)，并等待结果"""
+        with self._lock:
+            if self.max_pending is not None and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated(f"{self.name} 线程池繁忙 ({self.pending} 个调用等待中)")
+            self.submitted += 1
+            self.queued += 1
+            self.pending += 1
+        call = self._wrap(partial(func, *args, **kwargs), time.monotonic())
+        try:
+            concurrent_future = self._get_executor().submit(call)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+                self.pending -= 1
+            raise
+        concurrent_future.add_done_callback(self._release_if_cancelled)
+        future = asyncio.wrap_future(concurrent_future)
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(f"⏱️ {self.name} 调用超时 ({timeout}s): {getattr(func, '__name__', func)}")
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "active": self.active,
+            "queued": self.queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._total_wait / self.submitted * 1000, 2) if self.submitted else 0,
+        }
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# 所有 yfinance 调用共享的线程池
+yf_pool = BlockingPool("yfinance", max_workers=YF_MAX_WORKERS, timeout=YF_CALL_TIMEOUT)
+
+
+# 密码哈希专用线程池，登录高峰不会占满 yfinance 线程池或阻塞事件循环
+# bcrypt 在计算时释放 GIL，线程池即可利用多核；不设超时（线程无法中断，超时无意义）
+bcrypt_pool = BlockingPool("bcrypt", max_workers=BCRYPT_MAX_WORKERS, max_pending=BCRYPT_MAX_PENDING)
+
+
+async def run_blocking(func, *args, timeout=None, **kwargs):
+    """在共享的 yfinance 线程池中执行阻塞函数"""
+    return await yf_pool.run(func, *args, timeout=timeout, **kwargs)
@@ -0,0 +1,178 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import importlib.util
+import weakref
+from urllib.parse import urlsplit
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 超时（秒）、连接池大小、单个主机的并发上限与重试次数，可通过环境变量调整
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", 8))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.5))
+HTTP_MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", 10))
+
+# 安装了 h2 时启用 HTTP/2（同一连接多路复用）；否则使用 HTTP/1.1 keep-alive
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _client_options():
+    return {
+        "http2": HTTP2_ENABLED,
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "follow_redirects": True,
+    }
+
+
+def _backoff_delay(attempt, response=None):
+    """指数退避 + 随机抖动；429/503 带 Retry-After（秒）时按服务端要求等待"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), HTTP_MAX_BACKOFF)
+    delay = min(HTTP_BACKOFF * (2 ** attempt), HTTP_MAX_BACKOFF)
+    return delay * (0.5 + random.random() / 2)
+
+
+def _should_retry(attempt, retries, response=None):
+    if attempt >= retries:
+        return False
+    return response is None or response.status_code in RETRY_STATUS
+
+
+class _LoopClient:
+    """绑定到某个事件循环的 AsyncClient 及其按主机划分的信号量"""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(**_client_options())
+        self.host_limits = {}
+
+    def limit_for(self, host):
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(HTTP_PER_HOST_LIMIT)
+        return self.host_limits[host]
+
+
+# AsyncClient 不能跨事件循环使用，每个循环一个（服务进程中只有一个）
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def _get_loop_client():
+    loop = asyncio.get_running_loop()
+    entry = _loop_clients.get(loop)
+    if entry is None or entry.client.is_closed:
+        entry = _loop_clients[loop] = _LoopClient()
+    return entry
+
+
+def get_async_client():
+    """当前事件循环共享的 httpx.AsyncClient（连接池复用，避免每次请求重新握手）"""
+    return _get_loop_client().client
+
+
+async def request(method, url, *, retries=HTTP_RETRIES, **kwargs):
+    """
+    发送异步请求：共享连接池、单主机并发上限、超时，以及对连接错误和
+    429/5xx 的指数退避重试。最终失败时抛出 httpx.HTTPError
+    """
+    entry = _get_loop_client()
+    limit = entry.limit_for(urlsplit(url).netloc)
+    attempt = 0
+    while True:
+        response = None
+        try:
+            async with limit:
+                response = await entry.client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if not _should_retry(attempt, retries):
+                raise
+            logger.warning(f"⚠️ 请求失败，准备重试 {method} {urlsplit(url).netloc}: {str(e)}")
+        else:
+            if not _should_retry(attempt, retries, response):
+                response.raise_for_status()
+                return response
+        await asyncio.sleep(_backoff_delay(attempt, response))
+        attempt += 1
+
+
+async def get_json(url, **kwargs):
+    response = await request("GET", url, **kwargs)
+    return response.json()
+
+
+async def close_async_client():
+    """关闭当前事件循环的客户端（FastAPI lifespan 退出时调用）"""
+    entry = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry.client.aclose()
+
+
+# ====================== 同步客户端 ======================
+# 供线程池中执行的同步代码（LLM 摘要、搜索脚本）使用，同样复用连接
+
+_sync_client = None
+_sync_lock = threading.Lock()
+_sync_host_limits = {}
+
+
+def get_sync_client():
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        with _sync_lock:
+            if _sync_client is None or _sync_client.is_closed:
+                _sync_client = httpx.Client(**_client_options())
+    return _sync_client
+
+
+def _sync_limit_for(host):
+    with _sync_lock:
+        if host not in _sync_host_limits:
+            _sync_host_limits[host] = threading.BoundedSemaphore(HTTP_PER_HOST_LIMIT)
+        return _sync_host_limits[host]
+
+
+def request_sync(method, url, *, retries=HTTP_RETRIES, **kwargs):
+    """request() 的同步版本，重试与限流规则相同"""
+    client = get_sync_client()
+    limit = _sync_limit_for(urlsplit(url).netloc)
+    attempt = 0
+    while True:
+        response = None
+        try:
+            with limit:
+                response = client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if not _should_retry(attempt, retries):
+                raise
+            logger.warning(f"⚠️ 请求失败，准备重试 {method} {urlsplit(url).netloc}: {str(e)}")
+        else:
+            if not _should_retry(attempt, retries, response):
+                response.raise_for_status()
+                return response
+        time.sleep(_backoff_delay(attempt, response))
+        attempt += 1
+
+
+def close_sync_client():
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
@@ -1,15 +1,22 @@
 # File: backend/tools/llm_client.py
 
 import os
-import requests
+import httpx
 from dotenv import load_dotenv
 from backend.tools.text_preprocessing import preprocess_text
+from backend.tools.http_client import request_sync
+from backend.tools.near_dup import NearDuplicateIndex
 from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import tiktoken
 
 load_dotenv()
 
+# 生成摘要耗时较长，单独设置请求超时（秒）
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 120))
+# 判断两篇文章是否为同一报道时比较的开头字符数（转载通常导语相同）
+DEDUP_PREFIX_CHARS = int(os.getenv("LLM_DEDUP_PREFIX_CHARS", 2000))
+
 
 def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
     enc = tiktoken.encoding_for_model(model)
@@ -34,14 +41,18 @@ def create_deepseek_request(messages, model="deepseek/deepseek-chat-v3-0324:free
         "temperature": temperature,
     }
 
-    response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers=headers,
-        json=payload,
-    )
-
-    if response.status_code != 200:
-        raise Exception(f"OpenRouter API Error: {response.status_code} {response.text}")
+    try:
+        response = request_sync(
+            "POST",
+            "https://openrouter.ai/api/v1/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=LLM_TIMEOUT,
+            # 按调用计费且不是幂等请求：读超时/5xx 时服务端可能已经生成并计费，不自动重试
+            retries=0,
+        )
+    except httpx.HTTPStatusError as e:
+        raise Exception(f"OpenRouter API Error: {e.response.status_code} {e.response.text}")
 
     result = response.json()
     return result["choices"][0]["message"]["content"]
@@ -107,8 +118,19 @@ def summarize_content_with_deepseek(content: str, max_tokens: int = 3000, max_wo
 def summarize_multiple_articles(article_list: List[str]) -> List[dict]:
     print(f"📚 Summarizing {len(article_list)} articles...")
     results = []
+    duplicates = NearDuplicateIndex()
     for idx, article in enumerate(article_list):
         print(f"\n🔖 Article {idx+1}:")
+        # 同一报道的转载直接复用已生成的摘要，不再重复调用 LLM
+        duplicate_of = duplicates.add(idx, article[:DEDUP_PREFIX_CHARS])
+        if duplicate_of is not None:
+            print(f"♻️ Near-duplicate of article {duplicate_of+1}, reusing its summary.")
+            results.append({
+                "index": idx + 1,
+                "summary": results[duplicate_of]["summary"],
+                "duplicate_of": duplicate_of + 1
+            })
+            continue
         summary = summarize_content_with_deepseek(article)
         results.append({
             "index": idx + 1,
@@ -3,6 +3,7 @@ import yfinance as yf
 import logging
 from datetime import datetime
 from .cache import cache_result
+from .quote_engine import get_quotes
 
 logger = logging.getLogger(__name__)
 
@@ -16,26 +17,20 @@ DEFAULT_INDEX_DATA = {
 
 async def _fetch(ticker):
     try:
-        tk = yf.Ticker(ticker)
-        hist = tk.history(period="1d", interval="5m")  # 当日 5 分钟线
+        # 当日 5 分钟线，多个指数合并为一次批量下载
+        quote = (await get_quotes([ticker], period="1d", interval="5m")).get(ticker)
         
-        if hist.empty:
+        if not quote:
             logger.warning(f"⚠️ {ticker} 没有返回数据")
             raise ValueError(f"No data for {ticker}")
             
-        # 处理数据并返回
-        latest = hist.iloc[-1]
-        first = hist.iloc[0]
-        change = latest['Close'] - first['Open']
-        change_percent = (change / first['Open']) * 100
-        
         return {
             "symbol": ticker,
             "name": DEFAULT_INDEX_DATA.get(ticker, {}).get("name", ticker),
-            "price": round(latest['Close'], 2),
-            "change": round(change, 2),
-            "change_percent": round(change_percent, 2),
-            "data": hist['Close'].tolist()[-12:],  # 最近12个数据点
+            "price": round(quote['close'], 2),
+            "change": round(quote['change'], 2),
+            "change_percent": round(quote['change_percent'], 2),
+            "data": quote['closes'][-12:],  # 最近12个数据点
             "fallback": False
         }
     except Exception as e:
@@ -52,7 +47,7 @@ async def _fetch(ticker):
             "fallback": True
         }
 
-@cache_result(expire_seconds=900)  # 缓存15分钟
+@cache_result(expire_seconds=900, stale_seconds=120)  # 缓存15分钟，过期后2分钟内先返回旧值并后台刷新
 async def get_market_indexes():
     indexes = ["^GSPC", "^DJI", "^IXIC"]  # S&P500, 道指, 纳指
     
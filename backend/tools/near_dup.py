@@ -0,0 +1,142 @@
+import os
+import re
+import zlib
+import numpy as np
+
+# 判定为同一篇报道的 Jaccard 相似度阈值，以及 MinHash 签名长度和 LSH 分段数
+NEWS_DEDUP_THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", 0.7))
+NEWS_DEDUP_PERMUTATIONS = int(os.getenv("NEWS_DEDUP_PERMUTATIONS", 128))
+NEWS_DEDUP_BANDS = int(os.getenv("NEWS_DEDUP_BANDS", 32))
+
+# 字符 n-gram 长度：标题较短，字符级 shingle 对改写个别单词、标点更稳健
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text):
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """规范化后的字符 n-gram（32 位哈希），文本短于 n 时整体作为一个 shingle"""
+    text = normalize_text(text)
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    grams = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """固定随机种子的 MinHash：相同参数下同一文本在不同进程中得到相同签名"""
+
+    def __init__(self, num_perm=NEWS_DEDUP_PERMUTATIONS, seed=1):
+        rng = np.random.default_rng(seed)
+        # a、b 和 shingle 哈希都小于 2^32，a*x+b 不会溢出 uint64
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, text):
+        values = shingles(text)
+        if values.size == 0:
+            return None
+        permuted = (np.outer(self.a, values) + self.b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+
+def similarity(sig_a, sig_b):
+    """两个签名的估计 Jaccard 相似度"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+_default_hasher = None
+
+
+def _get_hasher(num_perm):
+    global _default_hasher
+    if num_perm != NEWS_DEDUP_PERMUTATIONS:
+        return MinHasher(num_perm)
+    if _default_hasher is None:
+        _default_hasher = MinHasher(num_perm)
+    return _default_hasher
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH 近似重复检测
+
+    签名分成 bands 段，任意一段完全相同的文章成为候选，再用签名相似度确认；
+    每篇文章只需查询 bands 个桶，与已索引的文章数量无关
+    """
+
+    def __init__(self, threshold=NEWS_DEDUP_THRESHOLD, num_perm=NEWS_DEDUP_PERMUTATIONS, bands=NEWS_DEDUP_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = _get_hasher(num_perm)
+        self._buckets = {}
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, sig):
+        return [(band, sig[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _match(self, sig, band_keys):
+        best_key, best_score = None, self.threshold
+        checked = set()
+        for band_key in band_keys:
+            for key in self._buckets.get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                score = similarity(sig, self._signatures[key])
+                if score >= best_score:
+                    best_key, best_score = key, score
+        return best_key
+
+    def query(self, text):
+        """返回与 text 近似重复的已索引文章的 key，没有时返回 None"""
+        sig = self.hasher.signature(text)
+        if sig is None:
+            return None
+        return self._match(sig, self._band_keys(sig))
+
+    def add(self, key, text):
+        """
+        索引一篇文章；若已存在近似重复的文章，返回其 key 且不再索引本篇，否则返回 None
+
+        空文本无法比较，总是视为新文章（不索引）
+        """
+        sig = self.hasher.signature(text)
+        if sig is None:
+            return None
+        band_keys = self._band_keys(sig)
+        duplicate_of = self._match(sig, band_keys)
+        if duplicate_of is not None:
+            return duplicate_of
+        self._signatures[key] = sig
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(key)
+        return None
+
+
+def record_text(record):
+    """用于比较的新闻文本：标题 + 摘要"""
+    return f"{record.title} {record.description}"
+
+
+def dedupe_news(records):
+    """按顺序保留每组近似重复报道中的第一篇（调用方先按优先级/时间排序）"""
+    index = NearDuplicateIndex()
+    unique = []
+    for position, record in enumerate(records):
+        if index.add(position, record_text(record)) is None:
+            unique.append(record)
+    return unique
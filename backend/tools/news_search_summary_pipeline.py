@@ -1,10 +1,10 @@
 # backend/tools/news_search_summary_pipeline.py
 
 import os
-import requests
 from urllib.parse import unquote
 from firecrawl import FirecrawlApp
-from llm_client import summarize_content_with_deepseek
+from backend.tools.llm_client import summarize_content_with_deepseek
+from backend.tools.http_client import request_sync
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,7 +27,7 @@ def search_news_online(query):
         "num": "3"
     }
     search_url = "https://serpapi.com/search"
-    response = requests.get(search_url, params=params)
+    response = request_sync("GET", search_url, params=params)
     data = response.json()
 
     if "organic_results" not in data or not data["organic_results"]:
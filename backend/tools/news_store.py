@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import urlsplit
+import pytz
+import humanize
+from dateutil import parser
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NEWS_STORE_PATH = os.getenv("NEWS_STORE_PATH", os.path.join(BACKEND_DIR, "models", "news.db"))
+# 同一个来源两次向上游拉取的最小间隔（秒）
+NEWS_MIN_REFRESH = float(os.getenv("NEWS_MIN_REFRESH", 300))
+# 新闻保留天数，更早的文章在入库时顺带清理
+NEWS_RETENTION_DAYS = float(os.getenv("NEWS_RETENTION_DAYS", 30))
+
+# 大盘新闻在 article_symbols 中使用的保留标签
+MARKET_TAG = "^MARKET"
+
+ET = pytz.timezone("US/Eastern")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    source TEXT,
+    published_ts INTEGER NOT NULL,
+    thumbnail TEXT,
+    sentiment TEXT,
+    provider TEXT,
+    related_symbol TEXT,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_articles_published ON articles (published_ts);
+CREATE TABLE IF NOT EXISTS article_symbols (
+    symbol TEXT NOT NULL,
+    article_id TEXT NOT NULL,
+    published_ts INTEGER NOT NULL,
+    PRIMARY KEY (symbol, article_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_article_symbols_recent ON article_symbols (symbol, published_ts);
+CREATE TABLE IF NOT EXISTS news_feeds (
+    feed TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    last_published_ts INTEGER
+);
+"""
+
+
+@dataclass
+class NewsRecord:
+    """所有来源统一的新闻记录"""
+    id: str
+    url: str
+    title: str
+    description: str
+    source: str
+    published_ts: int
+    thumbnail: str = ""
+    sentiment: dict = field(default_factory=dict)
+    provider: str = ""
+    related_symbol: str = ""
+    symbols: tuple = ()
+
+
+def canonical_url(url):
+    """去掉协议、查询参数和锚点，同一文章的不同跟踪链接得到相同的键"""
+    parts = urlsplit(url.strip())
+    return f"{parts.netloc.lower().removeprefix('www.')}{parts.path.rstrip('/')}"
+
+
+def article_id(url, title, published_ts):
+    basis = canonical_url(url) if url else f"{title.strip().lower()}|{published_ts}"
+    return hashlib.blake2b(basis.encode(), digest_size=16).hexdigest()
+
+
+def _timestamp(value):
+    if value in (None, ""):
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    dt = parser.isoparse(value) if "T" in value else parser.parse(value)
+    if dt.tzinfo is None:
+        dt = pytz.utc.localize(dt)
+    return int(dt.timestamp())
+
+
+def _make_record(url, title, description, source, published_ts, provider, related_symbol="",
+                 symbols=(), thumbnail="", sentiment=None):
+    symbols = tuple(dict.fromkeys(s for s in (related_symbol, *symbols) if s))
+    return NewsRecord(
+        id=article_id(url, title, published_ts),
+        url=url or "",
+        title=title or "",
+        description=description or "",
+        source=source or "",
+        published_ts=published_ts,
+        thumbnail=thumbnail or "",
+        sentiment=sentiment or {},
+        provider=provider,
+        related_symbol=related_symbol or "",
+        symbols=symbols,
+    )
+
+
+def normalize_yfinance(item, related_symbol="", symbols=()):
+    """yfinance 新闻条目（旧版扁平格式或新版 content 格式）-> NewsRecord"""
+    content = item.get("content")
+    if isinstance(content, dict):
+        provider = content.get("provider") or {}
+        url = ((content.get("canonicalUrl") or {}).get("url")
+               or (content.get("clickThroughUrl") or {}).get("url")
+               or provider.get("url", ""))
+        resolutions = (content.get("thumbnail") or {}).get("resolutions") or [{}]
+        return _make_record(
+            url, content.get("title", ""), content.get("summary", ""), provider.get("displayName", ""),
+            _timestamp(content.get("pubDate")), "yfinance", related_symbol, symbols,
+            thumbnail=resolutions[0].get("url", ""),
+        )
+
+    source = item.get("publisher", "")
+    if isinstance(source, dict):
+        source = source.get("name", "")
+    resolutions = (item.get("thumbnail") or {}).get("resolutions") or [{}]
+    return _make_record(
+        item.get("link", ""), item.get("title", ""), item.get("summary", ""), source,
+        _timestamp(item.get("providerPublishTime", 0)), "yfinance", related_symbol,
+        tuple(symbols) + tuple(item.get("relatedTickers") or ()),
+        thumbnail=resolutions[0].get("url", ""),
+    )
+
+
+def normalize_eodhd(item, related_symbol="", symbols=()):
+    """EODHD 新闻条目 -> NewsRecord；没有发布日期的条目返回 None"""
+    published_raw = item.get("date", "")
+    if not published_raw:
+        return None
+    return _make_record(
+        item.get("link", ""), item.get("title", ""), item.get("summary", ""), item.get("source", ""),
+        _timestamp(published_raw), "eodhd", related_symbol,
+        # EODHD 的代码带交易所后缀（AAPL.US），美股去掉后缀与 yfinance 代码一致
+        tuple(symbols) + tuple(s.removesuffix(".US") for s in item.get("symbols") or ()),
+        sentiment=item.get("sentiment") or {},
+    )
+
+
+def record_to_dict(record, related_symbol=None):
+    """NewsRecord -> 接口返回格式（包含此前各个接口用到的全部字段）"""
+    published = datetime.fromtimestamp(record.published_ts, tz=pytz.utc)
+    return {
+        "title": record.title,
+        "description": record.description,
+        "url": record.url,
+        "source": record.source,
+        "publishedAt": published.isoformat(),
+        "published_at": published.astimezone(ET).strftime("%Y-%m-%d %H:%M:%S %Z"),
+        "time_ago": humanize.naturaltime(datetime.now(pytz.utc) - published),
+        "thumbnail": record.thumbnail,
+        "sentiment": record.sentiment,
+        "relatedSymbol": related_symbol or record.related_symbol,
+    }
+
+
+class NewsStore:
+    """
+    本地新闻库：文章按 URL 哈希去重存储，并记录 代码 -> 文章 的映射
+
+    - 每个来源（feed）记录上次拉取时间和最新文章时间，用于增量拉取
+    - 读取走 (symbol, published_ts) 索引，不再每次请求都向上游扇出
+    """
+
+    def __init__(self, path=NEWS_STORE_PATH, min_refresh=NEWS_MIN_REFRESH, retention_days=NEWS_RETENTION_DAYS):
+        self.path = path
+        self.min_refresh = min_refresh
+        self.retention_seconds = retention_days * 86400
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._last_prune = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+        return conn
+
+    def feed_state(self, feed):
+        """返回 (是否仍在最小刷新间隔内, 该来源已入库的最新文章时间戳)"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT fetched_at, last_published_ts FROM news_feeds WHERE feed = ?", (feed,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return False, None
+        return time.time() - row[0] < self.min_refresh, row[1]
+
+    def add(self, feed, records):
+        """写入一批记录并更新来源状态（feed 为 None 时只写入文章），返回新增文章数"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO articles (id, url, title, description, source, published_ts, "
+                    "thumbnail, sentiment, provider, related_symbol, ingested_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(r.id, r.url, r.title, r.description, r.source, r.published_ts, r.thumbnail,
+                      json.dumps(r.sentiment), r.provider, r.related_symbol, now) for r in records],
+                )
+                added = conn.total_changes - before
+                conn.executemany(
+                    "INSERT OR IGNORE INTO article_symbols (symbol, article_id, published_ts) VALUES (?, ?, ?)",
+                    [(symbol, r.id, r.published_ts) for r in records for symbol in r.symbols],
+                )
+                if feed is not None:
+                    latest = max((r.published_ts for r in records), default=None)
+                    conn.execute(
+                        "INSERT INTO news_feeds (feed, fetched_at, last_published_ts) VALUES (?, ?, ?) "
+                        "ON CONFLICT(feed) DO UPDATE SET fetched_at = excluded.fetched_at, "
+                        "last_published_ts = MAX(COALESCE(last_published_ts, 0), COALESCE(excluded.last_published_ts, 0))",
+                        (feed, now, latest),
+                    )
+            if now - self._last_prune >= 3600:
+                self._prune(conn, now - self.retention_seconds)
+                self._last_prune = now
+        finally:
+            conn.close()
+        return added
+
+    def _prune(self, conn, cutoff):
+        with conn:
+            conn.execute("DELETE FROM article_symbols WHERE published_ts < ?", (cutoff,))
+            conn.execute("DELETE FROM articles WHERE published_ts < ?", (cutoff,))
+
+    def for_symbols(self, symbols, limit):
+        """
+        返回与任一代码关联的最新 limit 篇文章 [(NewsRecord, 匹配的代码)]，按发布时间倒序
+
+        每个代码走 (symbol, published_ts) 索引只取最新 limit 条，再合并去重
+        """
+        if not symbols or limit <= 0:
+            return []
+        per_symbol = " UNION ALL ".join(
+            "SELECT * FROM (SELECT symbol, article_id, published_ts FROM article_symbols "
+            "WHERE symbol = ? ORDER BY published_ts DESC LIMIT ?)"
+            for _ in symbols
+        )
+        query = (
+            "SELECT a.id, a.url, a.title, a.description, a.source, a.published_ts, a.thumbnail, "
+            "a.sentiment, a.provider, a.related_symbol, m.symbol "
+            f"FROM (SELECT article_id, MIN(symbol) AS symbol, MAX(published_ts) AS ts FROM ({per_symbol}) "
+            "GROUP BY article_id ORDER BY ts DESC LIMIT ?) m "
+            "JOIN articles a ON a.id = m.article_id ORDER BY a.published_ts DESC"
+        )
+        params = [p for symbol in symbols for p in (symbol, limit)] + [limit]
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return [
+            (NewsRecord(id=row[0], url=row[1], title=row[2], description=row[3] or "", source=row[4] or "",
+                        published_ts=row[5], thumbnail=row[6] or "", sentiment=json.loads(row[7] or "{}"),
+                        provider=row[8] or "", related_symbol=row[9] or ""), row[10])
+            for row in rows
+        ]
+
+
+# 全局共享的新闻库
+news_store = NewsStore()
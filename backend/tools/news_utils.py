@@ -1,13 +1,20 @@
 import os
+import math
 import logging
-import requests
+import heapq
 import asyncio
 import yfinance as yf
 from datetime import datetime, timedelta
 import pytz
 import humanize
 from dateutil import parser
-from .cache import cache_result
+from functools import partial
+from .cache import cache_result, single_flight
+from .executor import run_blocking
+from .http_client import get_json
+from .news_store import news_store, normalize_eodhd, normalize_yfinance, record_to_dict, MARKET_TAG, NEWS_MIN_REFRESH
+from .near_dup import NearDuplicateIndex, dedupe_news, record_text
+import httpx
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +22,15 @@ logger = logging.getLogger(__name__)
 EODHD_API_KEY = os.getenv("EODHD_API_KEY")
 BASE_URL = "https://eodhd.com/api"
 
+# EODHD 不可用时用于获取大盘新闻的代码（默认 S&P500, 纳指, 道指, 罗素2000 ETF）与单个源的超时（秒）
+NEWS_FEED_SYMBOLS = [s.strip().upper() for s in os.getenv("NEWS_FEED_SYMBOLS", "SPY,QQQ,DIA,IWM").split(",") if s.strip()]
+NEWS_SOURCE_TIMEOUT = float(os.getenv("NEWS_SOURCE_TIMEOUT", 5))
+# 每次向上游拉取的文章数量；读取时再按 limit 截取
+NEWS_FETCH_DEPTH = int(os.getenv("NEWS_FETCH_DEPTH", 20))
+
+class NewsFetchError(Exception):
+    """上游新闻来源请求失败；入库时不更新来源状态，下次读取会重试"""
+
 # ====================== 时间工具函数 ======================
 
 def convert_utc_to_et(utc_time_str: str) -> str:
@@ -32,7 +48,32 @@ def get_time_ago(utc_time_str: str) -> str:
 
 # ====================== EODHD API 实现 ======================
 
-def get_eodhd_market_news(limit=10):
+async def _fetch_eodhd_records(params, related_symbol="", symbols=()):
+    """请求 EODHD 新闻接口并标准化为 NewsRecord；请求失败或格式异常时抛出 NewsFetchError"""
+    try:
+        news_items = await get_json(
+            f"{BASE_URL}/news",
+            params={"offset": 0, **params, "api_token": EODHD_API_KEY, "fmt": "json"},
+        )
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"获取EODHD新闻失败: {e}")
+        raise NewsFetchError(f"EODHD: {e}") from e
+
+    if not isinstance(news_items, list):
+        logger.error(f"意外的EODHD新闻格式: {news_items}")
+        raise NewsFetchError("EODHD: unexpected response format")
+
+    # 跳过没有发布日期的新闻
+    records = (normalize_eodhd(item, related_symbol, symbols) for item in news_items)
+    return [record for record in records if record is not None]
+
+def _eodhd_since(params, since):
+    # 增量拉取：只请求上次入库的最新文章之后的新闻
+    if since:
+        params["from"] = datetime.fromtimestamp(since, tz=pytz.utc).strftime("%Y-%m-%d")
+    return params
+
+async def get_eodhd_market_news(limit=10):
     """
     从 EODHD API 获取最新的金融新闻列表
     
@@ -41,89 +82,137 @@ def get_eodhd_market_news(limit=10):
     if not EODHD_API_KEY:
         logger.warning("EODHD API密钥未设置，无法获取EODHD新闻")
         return []
-        
-    news_url = f"{BASE_URL}/news?offset=0&limit={limit}&api_token={EODHD_API_KEY}&fmt=json"
     try:
-        response = requests.get(news_url)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        logger.error(f"获取EODHD新闻失败: {e}")
-        return []
-
-    news_items = response.json()
-
-    if not isinstance(news_items, list):
-        logger.error(f"意外的EODHD新闻格式: {news_items}")
+        return [record_to_dict(record) for record in await _fetch_eodhd_records({"limit": limit})]
+    except NewsFetchError:
         return []
-
-    news_list = []
-    for item in news_items:
-        published_raw = item.get("date", "")
-        if not published_raw:
-            continue  # 跳过没有发布日期的新闻
-
-        news_list.append({
-            "title": item.get("title", ""),
-            "url": item.get("link", ""),
-            "published_at": convert_utc_to_et(published_raw),
-            "time_ago": get_time_ago(published_raw),
-            "source": item.get("source", ""),
-            "sentiment": item.get("sentiment", {}),  # 可能是空字典
-            "description": item.get("summary", "")
-        })
-
-    return news_list
 # --------------------------------------------------------------
 
 @cache_result(expire_seconds=1800)  # 缓存30分钟
 async def get_stock_related_news_EODHO(symbol, limit=10):
     """
-    从 EODHD API 获取最新的金融新闻列表
-    
-    注意：此函数使用EODHD API，需要API密钥
+    获取与特定股票相关的新闻（本地新闻库的索引查询）
+
+    注意：此函数使用EODHD API，需要API密钥；未配置时返回空列表。
+    配置后该代码的新闻以 EODHD 为主要来源增量入库，EODHD 无新文章时才补充 yfinance
     """
     if not EODHD_API_KEY:
         logger.warning("EODHD API密钥未设置，无法获取EODHD新闻")
         return []
-        
-    news_url = f"{BASE_URL}/news?s={symbol}&offset=0&limit={limit}&api_token={EODHD_API_KEY}&fmt=json"
+    return await _symbol_news([symbol.upper()], limit)
+
+# ====================== 增量入库 ======================
+
+async def ingest_feed(feed, fetch):
+    """
+    来源不在最小刷新间隔内时，调用 fetch(since) 拉取新文章并写入新闻库，返回新增文章数
+
+    since 为该来源已入库的最新文章时间戳（首次为 None）；同一来源的并发刷新只执行一次。
+    fetch 失败时抛出异常，不写入来源状态，下次读取会重新拉取
+    """
+    async def compute():
+        fresh, since = await run_blocking(news_store.feed_state, feed)
+        if fresh:
+            return 0
+        records = await fetch(since)
+        return await run_blocking(news_store.add, feed, records)
+
     try:
-        response = requests.get(news_url)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        logger.error(f"获取EODHD新闻失败: {e}")
-        return []
+        return await single_flight(f"news_feed:{feed}", compute)
+    except Exception as e:
+        logger.warning(f"新闻入库失败 {feed}: {str(e)}")
+        return 0
 
-    news_items = response.json()
+async def _try_eodhd(params, **kwargs):
+    """返回 (EODHD 的新文章, EODHD 是否请求成功)；未配置密钥或请求失败时由调用方回退到 yfinance"""
+    if not EODHD_API_KEY:
+        return [], False
+    try:
+        return await _fetch_eodhd_records(params, **kwargs), True
+    except NewsFetchError:
+        return [], False
 
-    if not isinstance(news_items, list):
-        logger.error(f"意外的EODHD新闻格式: {news_items}")
+async def _fetch_symbol_records(symbol, since):
+    params = _eodhd_since({"s": symbol, "limit": NEWS_FETCH_DEPTH}, since)
+    records, eodhd_ok = await _try_eodhd(params, related_symbol=symbol)
+    if records:
+        return records
+    _, news = await _fetch_feed_source(symbol, NEWS_FETCH_DEPTH, NEWS_SOURCE_TIMEOUT)
+    if news is not None:
+        return [normalize_yfinance(item, related_symbol=symbol) for item in news]
+    # EODHD 成功但没有新文章时仍算成功；所有来源都失败才不更新来源状态
+    if eodhd_ok:
+        return []
+    raise NewsFetchError(f"{symbol}: all news sources failed")
+
+async def _fetch_market_records(since):
+    # 优先使用EODHD API，若失败或未配置则回退到市场ETF的yfinance新闻
+    params = _eodhd_since({"limit": NEWS_FETCH_DEPTH}, since)
+    records, eodhd_ok = await _try_eodhd(params, symbols=(MARKET_TAG,))
+    if records:
+        return records
+    if not NEWS_FEED_SYMBOLS:
+        if EODHD_API_KEY and not eodhd_ok:
+            raise NewsFetchError("EODHD failed and no NEWS_FEED_SYMBOLS configured")
         return []
+    per_symbol = math.ceil(NEWS_FETCH_DEPTH / len(NEWS_FEED_SYMBOLS))
+    try:
+        return await fetch_feed_records(NEWS_FEED_SYMBOLS, per_symbol, symbols=(MARKET_TAG,))
+    except NewsFetchError:
+        if eodhd_ok:
+            return []
+        raise
+
+async def _read_store(symbols, limit):
+    """
+    从新闻库读取最新文章并合并不同来源对同一报道的转载，返回 [(NewsRecord, 匹配的代码)]
+
+    多读一倍的候选，去掉近似重复后仍能凑满 limit 条
+    """
+    rows = await run_blocking(news_store.for_symbols, symbols, limit * 2)
+    unique = dedupe_news([record for record, _ in rows])
+    kept = {id(record) for record in unique[:limit]}
+    return [(record, matched) for record, matched in rows if id(record) in kept]
+
+@cache_result(expire_seconds=NEWS_MIN_REFRESH)  # 与来源的最小刷新间隔一致
+async def get_symbol_news_depth(symbol):
+    """
+    单个代码最新的 NEWS_FETCH_DEPTH 篇文章（NewsRecord，按发布时间倒序）
 
-    news_list = []
-    for item in news_items:
-        published_raw = item.get("date", "")
-        if not published_raw:
-            continue  # 跳过没有发布日期的新闻
+    缓存键只有代码本身，不随 limit 或组合变化：所有用户、所有组合共享同一份，
+    读取方按需截取
+    """
+    await ingest_feed(f"symbol:{symbol}", partial(_fetch_symbol_records, symbol))
+    rows = await run_blocking(news_store.for_symbols, [symbol], NEWS_FETCH_DEPTH)
+    return [record for record, _ in rows]
 
-        news_list.append({
-            "title": item.get("title", ""),
-            "url": item.get("link", ""),
-            "published_at": convert_utc_to_et(published_raw),
-            "time_ago": get_time_ago(published_raw),
-            "source": item.get("source", ""),
-            "sentiment": item.get("sentiment", {}),  # 可能是空字典
-            "description": item.get("summary", "")
-        })
+async def _symbol_news(symbols, limit):
+    """
+    从各代码的深度缓存中按发布时间做 k 路堆合并，去重后取最新 limit 条
 
-    return news_list
+    合并是惰性的：凑满 limit 条即停止，不需要拼接并排序所有代码的文章
+    """
+    per_symbol = await asyncio.gather(*(get_symbol_news_depth(symbol) for symbol in symbols))
+    streams = [[(record, symbol) for record in records] for symbol, records in zip(symbols, per_symbol)]
+    seen_ids = set()
+    duplicates = NearDuplicateIndex()
+    news = []
+    for record, symbol in heapq.merge(*streams, key=lambda row: row[0].published_ts, reverse=True):
+        if len(news) >= limit:
+            break
+        # 同时关联多个代码的文章只保留一次，不同来源的转载也只保留最早合并到的一篇
+        if record.id in seen_ids or duplicates.add(record.id, record_text(record)) is not None:
+            continue
+        seen_ids.add(record.id)
+        news.append(record_to_dict(record, related_symbol=symbol))
+    return news
 
 # ====================== YFinance API 实现 ======================
 
 @cache_result(expire_seconds=1800)  # 缓存30分钟
 async def get_stock_related_news(symbol, limit=5, tab='news'):
     """
-    使用yfinance API获取与特定股票相关的新闻
+    获取与特定股票相关的新闻
     
     参数:
         symbol: 股票代码
@@ -131,30 +220,13 @@ async def get_stock_related_news(symbol, limit=5, tab='news'):
         tab: 新闻类型，可以是'news'(普通新闻)或'press releases'(新闻发布)
     """
     try:
+        if tab == 'news':
+            return await _symbol_news([symbol.upper()], limit)
+
+        # 新闻发布不入库，直接从yfinance获取
         ticker = yf.Ticker(symbol)
-        news = ticker.get_news(count=limit, tab=tab)
-        
-        # 处理返回的新闻数据
-        formatted_news = []
-        for item in news:
-            # 提取来源信息
-            source = item.get('publisher', '')
-            if isinstance(source, dict):
-                source = source.get('name', '')
-            
-            # 格式化时间
-            publish_time = datetime.fromtimestamp(item.get('providerPublishTime', 0))
-            
-            formatted_news.append({
-                "title": item.get('title', ''),
-                "description": item.get('summary', ''),
-                "url": item.get('link', ''),
-                "source": source,
-                "publishedAt": publish_time.isoformat(),
-                "thumbnail": item.get('thumbnail', {}).get('resolutions', [{}])[0].get('url', '')
-            })
-        
-        return formatted_news
+        news = await run_blocking(ticker.get_news, count=limit, tab=tab)
+        return [record_to_dict(normalize_yfinance(item, related_symbol=symbol.upper())) for item in news]
     except Exception as e:
         logger.error(f"获取股票相关新闻失败 {symbol}: {str(e)}")
         return []
@@ -166,68 +238,61 @@ async def get_latest_market_news(limit=5):
     """
     获取最新市场新闻
     
-    优先使用EODHD API，若失败则回退到yfinance API
+    优先使用EODHD API，若失败则回退到yfinance API；结果先增量写入本地新闻库再按发布时间读取
     """
     try:
-        # 首先尝试使用EODHD API
-        if EODHD_API_KEY:
-            eodhd_news = get_eodhd_market_news(limit)
-            if eodhd_news and len(eodhd_news) > 0:
-                return eodhd_news
-        
-        # 如果EODHD API失败或未配置，使用yfinance API
-        # 使用市场ETF获取大盘新闻
-        market_symbols = ["SPY", "QQQ", "DIA", "IWM"]  # S&P500, 纳指, 道指, 罗素2000
-        
-        all_news = []
-        for symbol in market_symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                news = ticker.get_news(count=int(limit/len(market_symbols)) + 1)
-                
-                for item in news:
-                    # 提取来源信息
-                    source = item.get('publisher', '')
-                    if isinstance(source, dict):
-                        source = source.get('name', '')
-                    
-                    # 格式化时间
-                    publish_time = datetime.fromtimestamp(item.get('providerPublishTime', 0))
-                    
-                    all_news.append({
-                        "title": item.get('title', ''),
-                        "description": item.get('summary', ''),
-                        "url": item.get('link', ''),
-                        "source": source,
-                        "publishedAt": publish_time.isoformat(),
-                        "relatedSymbol": symbol,
-                        "thumbnail": item.get('thumbnail', {}).get('resolutions', [{}])[0].get('url', '')
-                    })
-            except Exception as e:
-                logger.warning(f"获取{symbol}新闻失败: {str(e)}")
-                continue
-        
-        # 去重 - 根据新闻标题去重
-        unique_titles = set()
-        unique_news = []
-        
-        for item in all_news:
-            if item['title'] not in unique_titles:
-                unique_titles.add(item['title'])
-                unique_news.append(item)
-        
-        # 按发布时间排序
-        unique_news.sort(key=lambda x: x["publishedAt"], reverse=True)
-        
-        return unique_news[:limit]
+        await ingest_feed(MARKET_TAG, _fetch_market_records)
+        rows = await _read_store([MARKET_TAG], limit)
+        return [record_to_dict(record) for record, _ in rows]
     except Exception as e:
         logger.error(f"获取市场新闻失败: {str(e)}")
         return []
 
-@cache_result(expire_seconds=3600)  # 缓存1小时
+async def _fetch_feed_source(symbol, count, timeout):
+    try:
+        ticker = yf.Ticker(symbol)
+        return symbol, await run_blocking(ticker.get_news, count=count, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"获取{symbol}新闻超时 ({timeout}s)")
+    except Exception as e:
+        logger.warning(f"获取{symbol}新闻失败: {str(e)}")
+    # None 表示请求失败，与成功但没有新闻（空列表）区分
+    return symbol, None
+
+async def fetch_feed_records(feed_symbols, count, timeout=None, symbols=()):
+    """
+    并发获取多个代码的 yfinance 新闻，按完成顺序合并并去掉同一报道的近似重复，返回 NewsRecord 列表
+
+    总耗时取决于最慢的单个源（最多 NEWS_SOURCE_TIMEOUT 秒），而不是所有源之和；
+    失败的源被跳过，所有源都失败时抛出 NewsFetchError
+    """
+    timeout = NEWS_SOURCE_TIMEOUT if timeout is None else timeout
+    tasks = [_fetch_feed_source(symbol, count, timeout) for symbol in feed_symbols]
+    seen_ids = set()
+    duplicates = NearDuplicateIndex()
+    merged = []
+    failed = 0
+    for next_done in asyncio.as_completed(tasks):
+        symbol, news = await next_done
+        if news is None:
+            failed += 1
+            continue
+        for item in news:
+            record = normalize_yfinance(item, related_symbol=symbol, symbols=symbols)
+            if record.id in seen_ids or duplicates.add(record.id, record_text(record)) is not None:
+                continue
+            seen_ids.add(record.id)
+            merged.append(record)
+    if tasks and failed == len(tasks):
+        raise NewsFetchError(f"all news sources failed: {', '.join(feed_symbols)}")
+    return merged
+
 async def get_portfolio_news(symbols, limit=10):
     """
     获取投资组合相关新闻 - 适用于用户的关注和投资列表
+
+    不在组合级别缓存：由各代码共享的深度缓存合并而成，重叠的组合之间
+    上游请求数只与不同代码的数量有关
     
     参数:
         symbols: 股票代码列表
@@ -237,45 +302,7 @@ async def get_portfolio_news(symbols, limit=10):
         return []
         
     try:
-        # 计算每个股票应获取的新闻数量
-        news_per_symbol = max(1, round(limit / len(symbols)))
-        
-        all_news = []
-        tasks = []
-        
-        # 创建异步任务获取每个股票的新闻
-        for symbol in symbols:
-            tasks.append(get_stock_related_news(symbol, news_per_symbol))
-            #get_eodhd_market_news
-        
-        # 并行执行所有任务
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 处理结果
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"获取{symbols[i]}新闻失败: {str(result)}")
-                continue
-                
-            # 添加股票标识
-            for news_item in result:
-                news_item["relatedSymbol"] = symbols[i]
-            
-            all_news.extend(result)
-        
-        # 去重 - 根据新闻标题去重
-        unique_titles = set()
-        unique_news = []
-        
-        for item in all_news:
-            if item['title'] not in unique_titles:
-                unique_titles.add(item['title'])
-                unique_news.append(item)
-        
-        # 按发布时间排序
-        unique_news.sort(key=lambda x: x["publishedAt"], reverse=True)
-        
-        return unique_news[:limit]
+        return await _symbol_news(list(dict.fromkeys(s.upper() for s in symbols)), limit)
     except Exception as e:
         logger.error(f"获取投资组合新闻失败: {str(e)}")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,30 @@
+import pandas as pd
+
+# 输出字段 -> yfinance 列名
+PRICE_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close"}
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def frame_to_columns(hist: pd.DataFrame) -> dict:
+    """
+    按列向量化地把 K 线 DataFrame 转成并行数组:
+    {"date": [...], "open": [...], "high": [...], "low": [...], "close": [...], "volume": [...]}
+    """
+    hist = hist.dropna(subset=["Close"])
+    prices = hist[list(PRICE_COLUMNS.values())].round(2)
+    columns = {"date": hist.index.strftime(DATE_FORMAT).tolist()}
+    for name, column in PRICE_COLUMNS.items():
+        columns[name] = prices[column].tolist()
+    columns["volume"] = hist["Volume"].fillna(0).astype("int64").tolist()
+    return columns
+
+
+def frame_to_records(hist: pd.DataFrame) -> list:
+    """
+    把 K 线 DataFrame 转成前端使用的逐行记录列表
+
+    先按列完成格式化和取整，再一次性拼装成字典，避免逐行 iterrows
+    """
+    columns = frame_to_columns(hist)
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
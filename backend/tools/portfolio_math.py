@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+
+def quote_symbol(symbol, asset_type):
+    """投资记录中的代码 -> 行情代码（加密货币统一为 XXX-USD）"""
+    symbol = symbol.upper()
+    if asset_type == "crypto" and not symbol.endswith("-USD"):
+        return f"{symbol}-USD"
+    return symbol
+
+
+def transactions_frame(investments):
+    """把 Investment 记录转换为按交易日期排序的 DataFrame"""
+    columns = ["symbol", "asset_type", "quantity", "price_per_unit", "fees", "transaction_type", "transaction_date"]
+    frame = pd.DataFrame(
+        [{c: getattr(inv, c) for c in columns} for inv in investments],
+        columns=columns,
+    )
+    if frame.empty:
+        return frame
+    frame["fees"] = frame["fees"].fillna(0.0).astype(float)
+    frame["quantity"] = frame["quantity"].astype(float)
+    frame["price_per_unit"] = frame["price_per_unit"].astype(float)
+    frame["transaction_type"] = frame["transaction_type"].str.lower()
+    frame["transaction_date"] = pd.to_datetime(frame["transaction_date"], utc=True)
+    frame["quote_symbol"] = [quote_symbol(s, a) for s, a in zip(frame["symbol"], frame["asset_type"])]
+    return frame.sort_values("transaction_date", kind="stable").reset_index(drop=True)
+
+
+def _replay_symbol(qty, price, is_buy, is_sell):
+    """
+    按交易顺序重放单个代码的交易，维护移动加权平均成本
+
+    每笔卖出按当时的平均成本实现盈亏，并按比例减少持仓成本；
+    超过当前持仓的卖出部分不计入（返回值中记为 oversold）
+    """
+    held = basis = realized = oversold = 0.0
+    for q, p, buy, sell in zip(qty, price, is_buy, is_sell):
+        if buy:
+            held += q
+            basis += q * p
+        elif sell:
+            matched = min(q, held)
+            oversold += q - matched
+            if matched > 0:
+                avg = basis / held
+                realized += matched * (p - avg)
+                basis -= matched * avg
+                held -= matched
+            if held <= 0:
+                held = basis = 0.0
+    return held, basis, realized, oversold
+
+
+def compute_positions(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    按代码汇总交易，得到持仓、成本和已实现盈亏
+
+    成本按移动加权平均计算：交易按日期顺序重放，卖出部分的成本 = 卖出数量 × 当时的平均成本，
+    清仓后再买入重新计算平均成本。卖出数量超过当时持仓的部分记入 oversold_quantity，
+    不会产生负持仓
+    """
+    columns = ["symbol", "asset_type", "quantity", "avg_cost", "cost_basis",
+               "bought_quantity", "sold_quantity", "realized_pnl", "fees", "oversold_quantity"]
+    if transactions.empty:
+        return pd.DataFrame(columns=columns)
+
+    codes, symbols = pd.factorize(transactions["quote_symbol"])
+    size = len(symbols)
+    qty = transactions["quantity"].to_numpy()
+    price = transactions["price_per_unit"].to_numpy()
+    fees = transactions["fees"].to_numpy()
+    is_buy = (transactions["transaction_type"] == "buy").to_numpy()
+    is_sell = (transactions["transaction_type"] == "sell").to_numpy()
+
+    # 买卖数量和手续费与顺序无关，仍用分组数组运算
+    bought = np.bincount(codes, weights=qty * is_buy, minlength=size)
+    sold = np.bincount(codes, weights=qty * is_sell, minlength=size)
+    total_fees = np.bincount(codes, weights=fees, minlength=size)
+
+    # 成本和已实现盈亏依赖交易顺序（transactions 已按日期排序），逐个代码重放
+    replayed = np.zeros((size, 4))
+    for code, rows in pd.Series(np.arange(len(codes))).groupby(codes):
+        rows = rows.to_numpy()
+        replayed[code] = _replay_symbol(qty[rows], price[rows], is_buy[rows], is_sell[rows])
+    quantity, cost_basis, realized, oversold = replayed.T
+
+    asset_types = transactions.groupby(codes, sort=True)["asset_type"].first().to_numpy()
+    positions = pd.DataFrame({
+        "symbol": symbols,
+        "asset_type": asset_types,
+        "quantity": quantity,
+        "avg_cost": np.divide(cost_basis, quantity, out=np.zeros(size), where=quantity > 0),
+        "cost_basis": cost_basis,
+        "bought_quantity": bought,
+        "sold_quantity": sold,
+        "realized_pnl": realized,
+        "fees": total_fees,
+        "oversold_quantity": oversold,
+    })
+    return positions[columns]
+
+
+def value_positions(positions: pd.DataFrame, prices: dict) -> pd.DataFrame:
+    """用最新价格为持仓估值，计算市值和未实现盈亏（向量化）"""
+    positions = positions.copy()
+    positions["price"] = positions["symbol"].map(prices).astype(float)
+    positions["market_value"] = positions["quantity"] * positions["price"]
+    positions["unrealized_pnl"] = positions["market_value"] - positions["cost_basis"]
+    positions["unrealized_pnl_percent"] = (
+        positions["unrealized_pnl"] / positions["cost_basis"].where(positions["cost_basis"] > 0) * 100
+    )
+    return positions
+
+
+def summarize_positions(positions: pd.DataFrame) -> dict:
+    """组合整体汇总；没有行情的持仓不计入市值和未实现盈亏"""
+    priced = positions["price"].notna()
+    unrealized = float(positions.loc[priced, "unrealized_pnl"].sum())
+    realized = float(positions["realized_pnl"].sum())
+    fees = float(positions["fees"].sum())
+    return {
+        "market_value": round(float(positions.loc[priced, "market_value"].sum()), 2),
+        "cost_basis": round(float(positions["cost_basis"].sum()), 2),
+        "unrealized_pnl": round(unrealized, 2),
+        "realized_pnl": round(realized, 2),
+        "fees": round(fees, 2),
+        "total_pnl": round(unrealized + realized - fees, 2),
+        "unpriced_symbols": positions.loc[~priced & (positions["quantity"] > 0), "symbol"].tolist(),
+        "oversold_symbols": positions.loc[positions["oversold_quantity"] > 0, "symbol"].tolist(),
+    }
+
+
+def positions_to_records(positions: pd.DataFrame) -> list:
+    """转换为 JSON 友好的记录列表（NaN -> None）"""
+    rounded = positions.round(4).astype(object)
+    return rounded.where(positions.notna(), None).to_dict("records")
+
+
+TRADING_DAYS = 252
+
+
+def _executed_quantities(transactions: pd.DataFrame) -> np.ndarray:
+    """
+    每笔交易实际改变的持仓数量（买入为正、卖出为负）
+
+    与 compute_positions 的重放一致：卖出不超过当时的持仓，超出部分（oversold）不计入
+    """
+    held = {}
+    executed = np.zeros(len(transactions))
+    rows = zip(transactions["quote_symbol"], transactions["quantity"], transactions["transaction_type"])
+    for i, (symbol, q, kind) in enumerate(rows):
+        current = held.get(symbol, 0.0)
+        if kind == "buy":
+            executed[i] = q
+        elif kind == "sell":
+            executed[i] = -min(q, max(current, 0.0))
+        held[symbol] = current + executed[i]
+    return executed
+
+
+def holdings_matrix(transactions: pd.DataFrame, dates: pd.DatetimeIndex, symbols) -> pd.DataFrame:
+    """每个日期收盘时各代码的持仓数量（按日累加实际成交数量后对齐到价格日期，不会为负）"""
+    days = transactions["transaction_date"].dt.tz_convert(None).dt.normalize()
+    delta = pd.DataFrame({"day": days, "symbol": transactions["quote_symbol"], "qty": _executed_quantities(transactions)})
+    delta = delta.pivot_table(index="day", columns="symbol", values="qty", aggfunc="sum")
+    holdings = delta.cumsum()
+    holdings = holdings.reindex(holdings.index.union(dates)).ffill().reindex(dates)
+    return holdings.reindex(columns=symbols).fillna(0.0)
+
+
+def daily_flows(transactions: pd.DataFrame, dates: pd.DatetimeIndex) -> np.ndarray:
+    """
+    每个价格日期的外部资金流入：买入金额+手续费为正，卖出金额-手续费为负
+
+    非交易日的交易归入下一个价格日期；起始日之前的交易已体现在期初市值中；
+    超过持仓的卖出部分与 holdings_matrix 一样不计入
+    """
+    amount = _executed_quantities(transactions) * transactions["price_per_unit"].to_numpy()
+    amount = amount + transactions["fees"].to_numpy()
+    days = transactions["transaction_date"].dt.tz_convert(None).dt.normalize().to_numpy()
+    positions = np.searchsorted(dates.to_numpy(), days)
+    mask = (days >= dates[0].to_datetime64()) & (positions < len(dates))
+    return np.bincount(positions[mask], weights=amount[mask], minlength=len(dates))
+
+
+def equity_curve(transactions: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    用对齐后的价格矩阵（日期 × 代码）重放交易，得到每日组合市值和时间加权收益
+
+    资金流入 F_t 视为在当日收盘时发生：r_t = (V_t - F_t) / V_{t-1} - 1；
+    前一日没有持仓（建仓当日）时以成交金额为基数 r_t = V_t / F_t - 1，
+    两者都无法计算时当日收益记为 0
+    """
+    dates = prices.index
+    holdings = holdings_matrix(transactions, dates, prices.columns)
+    values = (holdings.to_numpy() * np.nan_to_num(prices.to_numpy())).sum(axis=1)
+    flows = daily_flows(transactions, dates)
+
+    previous = np.concatenate(([0.0], values[:-1]))
+    opening = previous <= 0
+    numerator = np.where(opening, values, values - flows)
+    base = np.where(opening, flows, previous)
+    returns = np.divide(numerator, base, out=np.ones_like(values), where=base > 0) - 1.0
+    growth = np.cumprod(1.0 + returns)
+    drawdown = growth / np.maximum.accumulate(growth) - 1.0
+
+    return pd.DataFrame({
+        "value": values,
+        "net_flow": flows,
+        "daily_return": returns,
+        "twr": growth - 1.0,
+        "drawdown": drawdown,
+    }, index=dates)
+
+
+def performance_metrics(curve: pd.DataFrame) -> dict:
+    """时间加权收益、最大回撤和年化波动率"""
+    if curve.empty:
+        return {"twr": 0.0, "max_drawdown": 0.0, "volatility": 0.0,
+                "start_value": 0.0, "end_value": 0.0, "net_flows": 0.0}
+    returns = curve["daily_return"].to_numpy()
+    active = curve["value"].to_numpy() > 0
+    volatility = float(np.std(returns[active], ddof=1) * np.sqrt(TRADING_DAYS)) if active.sum() > 1 else 0.0
+    return {
+        "twr": round(float(curve["twr"].iloc[-1]), 6),
+        "max_drawdown": round(float(curve["drawdown"].min()), 6),
+        "volatility": round(volatility, 6),
+        "start_value": round(float(curve["value"].iloc[0]), 2),
+        "end_value": round(float(curve["value"].iloc[-1]), 2),
+        "net_flows": round(float(curve["net_flow"].sum()), 2),
+    }
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import logging
+import pandas as pd
+from .cache import cache_result, TTLCache
+from .executor import run_blocking
+from .bar_store import bar_store
+from .portfolio_math import transactions_frame, equity_curve, performance_metrics
+
+logger = logging.getLogger(__name__)
+
+# 计算结果按 (用户, 区间, 交易指纹) 缓存；交易增删后指纹变化，自动失效
+_performance_cache = TTLCache(max_entries=1024)
+PERFORMANCE_TTL = 900
+DAY_FORMAT = "%Y-%m-%d"
+
+
+@cache_result(expire_seconds=900)  # 单个代码的日线收盘价，多个用户/组合之间共享
+async def get_daily_closes(symbol, period="1y"):
+    """与 get_stock_historical_data 相同的数据源（本地 K 线库）读取日线收盘价"""
+    hist = await run_blocking(bar_store.get_history, symbol, period, "1d")
+    if hist.empty:
+        return pd.Series(dtype=float, name=symbol)
+    closes = hist["Close"].copy()
+    # 统一为交易所当地日期（去掉时区），股票和加密货币可以按日期对齐
+    closes.index = closes.index.tz_localize(None).normalize()
+    return closes.groupby(level=0).last().rename(symbol)
+
+
+async def load_price_matrix(symbols, period):
+    """并发读取所有代码的收盘价并对齐为 日期 × 代码 矩阵"""
+    series = await asyncio.gather(*(get_daily_closes(symbol, period) for symbol in symbols))
+    prices = pd.concat(series, axis=1).sort_index() if series else pd.DataFrame()
+    # 周末/停牌日沿用最近收盘价，上市前的空缺用首个收盘价回填
+    return prices.reindex(columns=symbols).ffill().bfill()
+
+
+def transactions_fingerprint(investments):
+    ids = sorted(str(inv.id) for inv in investments)
+    return hashlib.blake2b("|".join(ids).encode(), digest_size=12).hexdigest()
+
+
+async def get_portfolio_performance(user_id, investments, period="1y"):
+    """
+    重建用户组合在区间内的每日市值，并计算时间加权收益、回撤和波动率
+
+    新增或删除交易时只有结果缓存失效；各代码的收盘价仍命中 get_daily_closes 缓存，
+    只有新出现的代码才需要读取价格
+    """
+    key = (user_id, period, transactions_fingerprint(investments))
+    cached = _performance_cache.get(key)
+    if cached is not None:
+        return cached
+
+    transactions = transactions_frame(investments)
+    if transactions.empty:
+        result = {
+            "period": period,
+            "start": None,
+            "end": None,
+            "metrics": performance_metrics(pd.DataFrame()),
+            "missing_prices": [],
+            "series": _to_series(pd.DataFrame()),
+        }
+        _performance_cache.set(key, result, PERFORMANCE_TTL)
+        return result
+
+    symbols = list(dict.fromkeys(transactions["quote_symbol"]))
+    prices = await load_price_matrix(symbols, period)
+
+    # 从第一笔交易开始展示
+    first_day = transactions["transaction_date"].dt.tz_convert(None).dt.normalize().min()
+    prices = prices[prices.index >= first_day].dropna(how="all")
+
+    curve = equity_curve(transactions, prices) if not prices.empty else pd.DataFrame()
+    missing = [s for s in symbols if s not in prices.columns or prices[s].isna().all()]
+    if missing:
+        logger.warning(f"⚠️ 以下代码没有历史价格，按 0 计入市值: {missing}")
+
+    result = {
+        "period": period,
+        "start": curve.index[0].strftime(DAY_FORMAT) if not curve.empty else None,
+        "end": curve.index[-1].strftime(DAY_FORMAT) if not curve.empty else None,
+        "metrics": performance_metrics(curve),
+        "missing_prices": missing,
+        "series": _to_series(curve),
+    }
+    _performance_cache.set(key, result, PERFORMANCE_TTL)
+    return result
+
+
+def _to_series(curve):
+    if curve.empty:
+        return {"date": [], "value": [], "twr": [], "drawdown": []}
+    return {
+        "date": curve.index.strftime(DAY_FORMAT).tolist(),
+        "value": curve["value"].round(2).tolist(),
+        "twr": curve["twr"].round(6).tolist(),
+        "drawdown": curve["drawdown"].round(6).tolist(),
+    }
@@ -0,0 +1,153 @@
+import os
+import asyncio
+import logging
+import pandas as pd
+import yfinance as yf
+from .executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# 同一刷新周期内的请求会在该窗口（秒）内合并为一次批量下载
+QUOTE_BATCH_WINDOW = float(os.getenv("QUOTE_BATCH_WINDOW", 0.05))
+QUOTE_BATCH_TIMEOUT = float(os.getenv("QUOTE_BATCH_TIMEOUT", 30))
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def download_bars(symbols, period="1d", interval="1d"):
+    """
+    一次批量请求下载多个代码的 OHLCV 数据
+
+    返回列为 (字段, 代码) 两级索引的 DataFrame
+    """
+    symbols = list(symbols)
+    frame = yf.download(
+        tickers=symbols,
+        period=period,
+        interval=interval,
+        group_by="column",
+        auto_adjust=True,
+        progress=False,
+        threads=True,
+        multi_level_index=True,
+    )
+    if frame is None:
+        return pd.DataFrame()
+    # 兼容单代码时返回单层列索引的情况
+    if not frame.empty and not isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = pd.MultiIndex.from_product([frame.columns, symbols[:1]])
+    return frame
+
+
+def quote_frame(frame, symbols):
+    """
+    按列向量化地把批量 K 线拆成每个代码一行的报价表
+
+    open 为区间内第一个开盘价，close 为最后一个有效收盘价，
+    volume 为区间成交量之和；没有数据的代码不会出现在结果中
+    """
+    columns = ["open", "high", "low", "close", "volume", "change", "change_percent"]
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=columns, dtype=float)
+
+    fields = {f: frame[f].reindex(columns=symbols) for f in OHLCV_FIELDS}
+    close = fields["Close"]
+    has_data = close.notna().any()
+
+    summary = pd.DataFrame({
+        "open": fields["Open"].bfill().iloc[0],
+        "high": fields["High"].max(),
+        "low": fields["Low"].min(),
+        "close": close.ffill().iloc[-1],
+        "volume": fields["Volume"].fillna(0).sum(),
+    })
+    summary = summary[has_data]
+    summary["change"] = summary["close"] - summary["open"]
+    summary["change_percent"] = (summary["change"] / summary["open"].where(summary["open"] > 0)) * 100
+    summary["change_percent"] = summary["change_percent"].fillna(0)
+    return summary[columns]
+
+
+def split_quotes(frame, symbols, with_closes=False):
+    """
+    把批量 K 线拆成 {代码: 报价字典}
+
+    with_closes=True 时附带该代码区间内的收盘价序列（用于迷你图）
+    """
+    symbols = list(symbols)
+    summary = quote_frame(frame, symbols)
+    quotes = summary.to_dict("index")
+    if with_closes and quotes:
+        close = frame["Close"]
+        for symbol in quotes:
+            quotes[symbol]["closes"] = close[symbol].dropna().tolist()
+    return quotes
+
+
+class _Batch:
+    def __init__(self, future):
+        self.symbols = set()
+        self.future = future
+
+
+class QuoteEngine:
+    """
+    报价引擎：把同一刷新周期内所有需要的代码收集起来，
+    用一次批量下载获取，再拆分给各个调用方
+    """
+
+    def __init__(self, batch_window=QUOTE_BATCH_WINDOW):
+        self.batch_window = batch_window
+        self._pending = {}
+        self._tasks = set()
+        self.batches = 0
+
+    async def get_quotes(self, symbols, period="1d", interval="1d"):
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+
+        key = (period, interval)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _Batch(asyncio.get_running_loop().create_future())
+            self._pending[key] = batch
+            task = asyncio.create_task(self._flush_later(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.symbols.update(symbols)
+
+        quotes = await asyncio.shield(batch.future)
+        return {s: quotes[s] for s in symbols if s in quotes}
+
+    async def _flush_later(self, key, batch):
+        await asyncio.sleep(self.batch_window)
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+
+        symbols = sorted(batch.symbols)
+        period, interval = key
+        try:
+            frame = await run_blocking(download_bars, symbols, period, interval, timeout=QUOTE_BATCH_TIMEOUT)
+            quotes = split_quotes(frame, symbols, with_closes=True)
+        except Exception as e:
+            logger.error(f"❌ 批量获取报价失败 {symbols}: {str(e)}")
+            batch.future.set_exception(e)
+            # 调用方可能已全部取消，避免 "exception was never retrieved" 警告
+            batch.future.exception()
+            return
+
+        self.batches += 1
+        missing = set(symbols) - set(quotes)
+        if missing:
+            logger.warning(f"⚠️ 批量报价中没有返回数据: {sorted(missing)}")
+        batch.future.set_result(quotes)
+
+
+# 全局共享的报价引擎
+quote_engine = QuoteEngine()
+
+
+async def get_quotes(symbols, period="1d", interval="1d"):
+    """获取多个代码的报价，同一周期内的并发调用会合并为一次批量请求"""
+    return await quote_engine.get_quotes(symbols, period=period, interval=interval)
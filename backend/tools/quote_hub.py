@@ -0,0 +1,180 @@
+import os
+import time
+import asyncio
+import logging
+from .quote_engine import get_quotes
+
+logger = logging.getLogger(__name__)
+
+# 推送轮询间隔（秒）与单个连接可订阅的代码数量上限
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", 5))
+STREAM_MAX_SYMBOLS = int(os.getenv("STREAM_MAX_SYMBOLS", 20))
+# 全局上限：同时轮询的不同代码数（即轮询任务数）与同时在线的订阅数
+STREAM_MAX_TOTAL_SYMBOLS = int(os.getenv("STREAM_MAX_TOTAL_SYMBOLS", 500))
+STREAM_MAX_SUBSCRIPTIONS = int(os.getenv("STREAM_MAX_SUBSCRIPTIONS", 1000))
+
+QUOTE_FIELDS = ["price", "change", "change_percent", "volume"]
+
+
+async def _fetch_quote(symbol):
+    quote = (await get_quotes([symbol])).get(symbol)
+    if not quote:
+        return None
+    return {
+        "price": round(quote["close"], 2),
+        "change": round(quote["change"], 2),
+        "change_percent": round(quote["change_percent"], 2),
+        "volume": int(quote["volume"]),
+    }
+
+
+class HubFull(RuntimeError):
+    """新的订阅会超过全局的代码数或订阅数上限"""
+
+
+class Subscription:
+    """
+    单个客户端的订阅
+
+    待发送的更新按代码合并保存：客户端消费慢时，同一代码的多次变化
+    会合并成一条（只保留最新值），内存占用最多与订阅的代码数成正比
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.closed = False
+        self._pending = {}
+        self._event = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, symbol, fields):
+        if symbol in self._pending:
+            self._pending[symbol].update(fields)
+            self.coalesced += 1
+        else:
+            self._pending[symbol] = dict(fields)
+        self._event.set()
+
+    async def next_batch(self, timeout=None):
+        """等待下一批更新，返回 {代码: 变化的字段}；超时返回空字典"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        batch, self._pending = self._pending, {}
+        self._event.clear()
+        return batch
+
+
+class QuoteHub:
+    """
+    行情推送中心：每个代码只有一个上游轮询任务，结果分发给所有订阅者
+
+    - 轮询对齐到 poll_interval 的整数倍，多个代码的轮询会被报价引擎合并为一次批量请求
+    - 只推送与上一次相比发生变化的字段
+    - 某个代码没有订阅者后停止轮询，上游负载只与订阅的代码数有关，与连接数无关
+    - 轮询的代码总数和订阅总数有全局上限，超出时 subscribe 抛出 HubFull；
+      单个订阅超过 STREAM_MAX_SYMBOLS 个代码时抛出 ValueError
+    """
+
+    def __init__(self, fetch=_fetch_quote, poll_interval=STREAM_POLL_INTERVAL,
+                 max_symbols=STREAM_MAX_TOTAL_SYMBOLS, max_subscriptions=STREAM_MAX_SUBSCRIPTIONS):
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.max_symbols = max_symbols
+        self.max_subscriptions = max_subscriptions
+        self._subscribers = {}  # symbol -> set[Subscription]
+        self._pollers = {}      # symbol -> asyncio.Task
+        self._latest = {}       # symbol -> 最新完整报价
+        self._subscriptions = 0
+        self.rejected = 0
+
+    def check_capacity(self, symbols):
+        """
+        订阅 symbols 会超过全局上限时抛出 HubFull，代码数超过单个订阅的上限时
+        抛出 ValueError（不修改任何状态）
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if len(symbols) > STREAM_MAX_SYMBOLS:
+            raise ValueError(f"单个连接最多订阅 {STREAM_MAX_SYMBOLS} 个代码，收到 {len(symbols)} 个")
+        new_symbols = sum(1 for symbol in symbols if symbol not in self._pollers)
+        if self._subscriptions >= self.max_subscriptions:
+            raise HubFull(f"行情推送订阅数已达上限 ({self.max_subscriptions})")
+        if len(self._pollers) + new_symbols > self.max_symbols:
+            raise HubFull(f"行情推送代码数已达上限 ({self.max_symbols})")
+
+    def subscribe(self, symbols):
+        try:
+            self.check_capacity(symbols)
+        except HubFull:
+            self.rejected += 1
+            raise
+        subscription = Subscription(dict.fromkeys(symbols))
+        self._subscriptions += 1
+        for symbol in subscription.symbols:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol in self._latest:
+                # 新订阅者先收到一份完整快照
+                subscription.push(symbol, self._latest[symbol])
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.create_task(self._poll(symbol))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription.closed:
+            return
+        subscription.closed = True
+        self._subscriptions -= 1
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._latest.pop(symbol, None)
+                poller = self._pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+
+    async def stop(self):
+        """停止所有轮询任务（应用关闭时调用）；之后的退订只更新计数"""
+        pollers = list(self._pollers.values())
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+
+    async def _poll(self, symbol):
+        while symbol in self._subscribers:
+            try:
+                quote = await self.fetch(symbol)
+            except Exception as e:
+                logger.warning(f"⚠️ 推送轮询失败 {symbol}: {str(e)}")
+                quote = None
+            if quote:
+                self._publish(symbol, quote)
+            # 对齐到轮询间隔的整数倍，让所有代码在同一时刻刷新
+            await asyncio.sleep(self.poll_interval - (time.time() % self.poll_interval))
+
+    def _publish(self, symbol, quote):
+        previous = self._latest.get(symbol, {})
+        changed = {k: v for k, v in quote.items() if previous.get(k) != v}
+        if not changed:
+            return
+        self._latest[symbol] = {**previous, **quote}
+        for subscription in self._subscribers.get(symbol, ()):
+            subscription.push(symbol, changed)
+
+    def stats(self):
+        return {
+            "symbols": len(self._pollers),
+            "subscriptions": self._subscriptions,
+            "rejected": self.rejected,
+        }
+
+
+# 全局共享的行情推送中心
+quote_hub = QuoteHub()
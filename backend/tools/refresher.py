@@ -0,0 +1,153 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, time as dtime
+import pytz
+from .market_indexes import get_market_indexes
+from .stock_utils import get_top_traded_stocks
+from .crypto_utils import get_top_cryptos
+from .news_utils import get_latest_market_news
+
+logger = logging.getLogger(__name__)
+
+# 后台预热开关与刷新间隔（秒）
+REFRESH_ENABLED = os.getenv("MARKET_REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+EQUITY_OPEN_INTERVAL = int(os.getenv("REFRESH_EQUITY_OPEN_INTERVAL", 60))
+EQUITY_CLOSED_INTERVAL = int(os.getenv("REFRESH_EQUITY_CLOSED_INTERVAL", 1800))
+CRYPTO_INTERVAL = int(os.getenv("REFRESH_CRYPTO_INTERVAL", 120))
+NEWS_INTERVAL = int(os.getenv("REFRESH_NEWS_INTERVAL", 600))
+# 预热的列表长度，需与前端请求的 limit 一致才能命中缓存
+REFRESH_TOP_LIMITS = [int(x) for x in os.getenv("REFRESH_TOP_LIMITS", "5").split(",") if x.strip()]
+REFRESH_NEWS_LIMITS = [int(x) for x in os.getenv("REFRESH_NEWS_LIMITS", "5").split(",") if x.strip()]
+
+# 刷新写入的新鲜期比刷新间隔多出的余量，保证下一次刷新前缓存一直有效
+TTL_GRACE_SECONDS = 60
+
+ET = pytz.timezone("US/Eastern")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+
+def is_us_market_open(now=None):
+    """美股常规交易时段（周一至周五 9:30-16:00 ET，不含节假日）"""
+    now = (now or datetime.now(pytz.utc)).astimezone(ET)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+class RefreshJob:
+    """
+    一个预热任务：定期调用被 cache_result 装饰的函数的 refresh()
+
+    market:
+        "equity" - 开盘时用 open_interval，收盘后用 closed_interval
+        其他     - 全天使用 open_interval（加密货币 7x24、新闻）
+    """
+
+    def __init__(self, name, func, kwargs=None, market="equity", open_interval=60, closed_interval=None):
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.market = market
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval or open_interval
+        self.last_run = None
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+
+    def interval(self, market_open):
+        if self.market == "equity" and not market_open:
+            return self.closed_interval
+        return self.open_interval
+
+    def is_due(self, now, market_open):
+        # 按当前的市场状态判断，开盘时收盘期的长间隔会立即缩短
+        return self.last_run is None or now - self.last_run >= self.interval(market_open)
+
+    async def run(self, market_open):
+        interval = self.interval(market_open)
+        ttl = max(self.func.expire_seconds, interval + TTL_GRACE_SECONDS)
+        started = self.last_run = time.monotonic()
+        try:
+            await self.func.refresh(expire_seconds=ttl, **self.kwargs)
+            self.runs += 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"⚠️ 预热任务失败 {self.name}: {str(e)}")
+        finally:
+            self.last_duration = round(time.monotonic() - started, 3)
+
+
+def default_jobs():
+    jobs = [
+        RefreshJob("market_indexes", get_market_indexes, market="equity",
+                   open_interval=EQUITY_OPEN_INTERVAL, closed_interval=EQUITY_CLOSED_INTERVAL),
+    ]
+    for limit in REFRESH_TOP_LIMITS:
+        jobs.append(RefreshJob(f"top_stocks:{limit}", get_top_traded_stocks, {"limit": limit}, market="equity",
+                               open_interval=EQUITY_OPEN_INTERVAL, closed_interval=EQUITY_CLOSED_INTERVAL))
+        jobs.append(RefreshJob(f"top_cryptos:{limit}", get_top_cryptos, {"limit": limit}, market="crypto",
+                               open_interval=CRYPTO_INTERVAL))
+    for limit in REFRESH_NEWS_LIMITS:
+        jobs.append(RefreshJob(f"latest_news:{limit}", get_latest_market_news, {"limit": limit}, market="news",
+                               open_interval=NEWS_INTERVAL))
+    return jobs
+
+
+class MarketDataRefresher:
+    """在 FastAPI lifespan 中启动的后台调度器，按间隔主动刷新热门数据缓存"""
+
+    def __init__(self, jobs=None, tick_seconds=5.0):
+        self.jobs = jobs if jobs is not None else default_jobs()
+        self.tick_seconds = tick_seconds
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"🚀 市场数据预热已启动: {[job.name for job in self.jobs]}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_due_jobs(self):
+        now = time.monotonic()
+        market_open = is_us_market_open()
+        due = [job for job in self.jobs if job.is_due(now, market_open)]
+        if due:
+            await asyncio.gather(*(job.run(market_open) for job in due))
+        return due
+
+    async def _run(self):
+        while True:
+            await self.run_due_jobs()
+            await asyncio.sleep(self.tick_seconds)
+
+    def stats(self):
+        market_open = is_us_market_open()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "us_market_open": market_open,
+            "jobs": [
+                {
+                    "name": job.name,
+                    "interval": job.interval(market_open),
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_duration": job.last_duration,
+                }
+                for job in self.jobs
+            ],
+        }
+
+
+market_refresher = MarketDataRefresher()
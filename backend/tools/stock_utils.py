@@ -2,6 +2,11 @@ import yfinance as yf
 import logging
 import asyncio
 from .cache import cache_result
+from .executor import run_blocking
+from .quote_engine import get_quotes
+from .ohlcv import frame_to_records, frame_to_columns
+from .bar_store import bar_store
+from .downsample import downsample_frame
 
 logger = logging.getLogger(__name__)
 
@@ -17,27 +22,31 @@ DEFAULT_STOCK_DATA = {
     # 可以添加更多默认数据
 }
 
+@cache_result(expire_seconds=86400)  # 公司名称基本不变，缓存1天
+async def get_stock_name(symbol):
+    """获取公司简称，失败时回退到默认数据"""
+    try:
+        info = await run_blocking(lambda: yf.Ticker(symbol).info)
+        return info.get('shortName', symbol)
+    except:
+        return DEFAULT_STOCK_DATA.get(symbol, {}).get("name", symbol)
+
 async def _fetch_stock(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1d")
+        # 同一时间的多个调用会被报价引擎合并为一次批量下载
+        quote = (await get_quotes([symbol])).get(symbol)
         
-        if hist.empty:
+        if not quote:
             logger.warning(f"⚠️ {symbol} 没有返回数据")
             raise ValueError(f"No data for {symbol}")
             
         # 获取公司信息
-        try:
-            info = ticker.info
-            name = info.get('shortName', symbol)
-        except:
-            name = DEFAULT_STOCK_DATA.get(symbol, {}).get("name", symbol)
+        name = await get_stock_name(symbol)
         
         # 计算价格变化
-        latest_price = hist['Close'].iloc[-1]
-        prev_close = hist['Open'].iloc[0]
-        change = latest_price - prev_close
-        change_percent = (change / prev_close) * 100 if prev_close > 0 else 0
+        latest_price = quote['close']
+        change = quote['change']
+        change_percent = quote['change_percent']
         
         return {
             "symbol": symbol,
@@ -59,7 +68,7 @@ async def _fetch_stock(symbol):
             "fallback": True
         }
 
-@cache_result(expire_seconds=900)  # 缓存15分钟
+@cache_result(expire_seconds=900, stale_seconds=120)  # 缓存15分钟，过期后2分钟内先返回旧值并后台刷新
 async def get_top_traded_stocks(limit=5):
     # 热门科技股列表
     symbols = ["AAPL", "MSFT", "AMZN", "GOOGL", "META", "NVDA", "TSLA"][:limit]
@@ -143,8 +152,7 @@ async def search_stocks(query):
         # 如果没有结果，尝试使用yfinance的ticker查询
         if not results and len(query) >= 2:
             try:
-                ticker = yf.Ticker(query)
-                info = ticker.info
+                info = await run_blocking(lambda: yf.Ticker(query).info)
                 if 'symbol' in info:
                     stock = await get_stock_details(query)
                     if stock:
@@ -157,6 +165,23 @@ async def search_stocks(query):
         logger.error(f"搜索股票失败: {str(e)}")
         return []
 
+def _load_stock_details(symbol):
+    """阻塞部分：拉取当日行情和完整公司信息（在线程池中执行）"""
+    ticker = yf.Ticker(symbol)
+
+    # 获取当日股票数据
+    hist = ticker.history(period="1d")
+    if hist.empty:
+        return hist, {}
+
+    # 获取公司信息
+    info = {}
+    try:
+        info = ticker.info
+    except Exception as e:
+        logger.warning(f"无法获取{symbol}的信息: {str(e)}")
+    return hist, info
+
 # 新增函数 - 获取股票详情
 @cache_result(expire_seconds=300)  # 缓存5分钟
 async def get_stock_details(symbol):
@@ -164,21 +189,11 @@ async def get_stock_details(symbol):
     获取单个股票的详细信息，包括价格、变化等
     """
     try:
-        ticker = yf.Ticker(symbol)
-        
-        # 获取当日股票数据
-        hist = ticker.history(period="1d")
+        hist, info = await run_blocking(_load_stock_details, symbol)
         if hist.empty:
             logger.warning(f"{symbol} 没有返回数据")
             return use_default_stock_data(symbol)
             
-        # 获取公司信息
-        info = {}
-        try:
-            info = ticker.info
-        except Exception as e:
-            logger.warning(f"无法获取{symbol}的信息: {str(e)}")
-            
         # 提取基本信息
         name = info.get('shortName', info.get('longName', symbol))
         sector = info.get('sector', '')
@@ -237,7 +252,7 @@ def use_default_stock_data(symbol):
 
 # 新增函数 - 获取股票历史数据
 @cache_result(expire_seconds=3600)  # 缓存1小时
-async def get_stock_historical_data(symbol, period="1mo", interval="1d"):
+async def get_stock_historical_data(symbol, period="1mo", interval="1d", format="records", points=None):
     """
     获取股票历史数据，用于图表显示
     
@@ -245,27 +260,24 @@ async def get_stock_historical_data(symbol, period="1mo", interval="1d"):
         symbol: 股票代码
         period: 时间范围 (1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max)
         interval: 时间间隔 (1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo)
+        format: "records" 返回逐行记录列表；"columns" 返回并行数组，体积更小
+        points: 最多返回的点数，超过时用 LTTB 算法按收盘价形状降采样
     """
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period, interval=interval)
+        # 从本地 K 线库读取，只向上游请求缺失的部分
+        hist = await run_blocking(bar_store.get_history, symbol, period, interval)
         
         if hist.empty:
             return {"error": "无数据"}
         
-        # 将数据转换为前端友好的格式
-        data = []
-        for index, row in hist.iterrows():
-            data.append({
-                "date": index.strftime('%Y-%m-%d %H:%M:%S'),
-                "open": round(row['Open'], 2),
-                "high": round(row['High'], 2),
-                "low": round(row['Low'], 2),
-                "close": round(row['Close'], 2),
-                "volume": int(row['Volume'])
-            })
+        # 长区间降采样，保证图表数据量有上限
+        if points:
+            hist = downsample_frame(hist, points)
         
-        return data
+        # 将数据转换为前端友好的格式（按列向量化处理）
+        if format == "columns":
+            return frame_to_columns(hist)
+        return frame_to_records(hist)
     except Exception as e:
         logger.error(f"获取股票历史数据失败 {symbol}: {str(e)}")
         return {"error": str(e)}
\ No newline at end of file
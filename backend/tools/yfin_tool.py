@@ -4,6 +4,8 @@ import yfinance as yf
 from datetime import datetime
 import pytz
 from typing import List, Dict
+from .quote_engine import download_bars, quote_frame
+from .news_store import news_store, normalize_yfinance
 
 # -------------------
 # Top Stocks by Volume
@@ -21,23 +23,13 @@ def fetch_top_stocks_by_volume(limit: int = 5) -> List[Dict]:
         "AMD", "INTC", "BA", "PYPL", "QCOM", "SHOP", "CRM"
     ]
 
-    stock_volume = []
+    # One batched download for the whole list, then rank by volume column-wise
+    quotes = quote_frame(download_bars(stock_list), stock_list).nlargest(limit, "volume")
 
-    for ticker in stock_list:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period="1d")
-        if not data.empty:
-            volume = data['Volume'].iloc[-1]
-            price = data['Close'].iloc[-1]
-            stock_volume.append({
-                "ticker": ticker,
-                "volume": volume,
-                "price": price
-            })
-
-    stock_volume.sort(key=lambda x: x['volume'], reverse=True)
-
-    return stock_volume[:limit]
+    return [
+        {"ticker": ticker, "volume": volume, "price": price}
+        for ticker, volume, price in zip(quotes.index, quotes["volume"], quotes["close"])
+    ]
 
 # -------------------
 # Top Cryptos by Volume
@@ -54,23 +46,13 @@ def fetch_top_cryptos_by_volume(limit: int = 5) -> List[Dict]:
         "BTC-USD", "ETH-USD", "SOL-USD", "BNB-USD", "DOGE-USD", "ADA-USD", "XRP-USD", "AVAX-USD"
     ]
 
-    crypto_volume = []
-
-    for crypto in crypto_list:
-        coin = yf.Ticker(crypto)
-        data = coin.history(period="1d")
-        if not data.empty:
-            volume = data['Volume'].iloc[-1]
-            price = data['Close'].iloc[-1]
-            crypto_volume.append({
-                "crypto": crypto,
-                "volume": volume,
-                "price": price
-            })
-
-    crypto_volume.sort(key=lambda x: x['volume'], reverse=True)
+    # One batched download for the whole list, then rank by volume column-wise
+    quotes = quote_frame(download_bars(crypto_list), crypto_list).nlargest(limit, "volume")
 
-    return crypto_volume[:limit]
+    return [
+        {"crypto": crypto, "volume": volume, "price": price}
+        for crypto, volume, price in zip(quotes.index, quotes["volume"], quotes["close"])
+    ]
 
 # -------------------
 # News Fetching and Extraction
@@ -102,9 +84,11 @@ def time_ago(publish_time_utc: datetime) -> str:
     else:
         return "just now"
 
-def fetch_news_for_ticker(ticker: str, count: int = 5) -> List[Dict]:
+def fetch_news_for_ticker(ticker: str, count: int = 5, store=None) -> List[Dict]:
     """
     Fetch recent news headlines for a specific ticker (stock or crypto) using get_news().
+
+    The normalized records are also written to ``store`` (defaults to the shared news_store).
     
     Returns:
         A list of dictionaries containing cleaned news details.
@@ -118,11 +102,11 @@ def fetch_news_for_ticker(ticker: str, count: int = 5) -> List[Dict]:
         print(f"Error fetching news for {ticker}: {e}")
         news_items = []
 
+    records = []
     for item in news_items:
         try:
-            content = item.get("content", {})
-            pub_date_raw = content.get("pubDate", "1970-01-01T00:00:00Z")
-            pub_date_dt = datetime.fromisoformat(pub_date_raw.replace("Z", "+00:00"))  # Standard UTC datetime
+            record = normalize_yfinance(item, related_symbol=ticker.upper())
+            pub_date_dt = datetime.fromtimestamp(record.published_ts, tz=pytz.utc)  # Standard UTC datetime
 
             # Formatting
             pub_date_est = utc_to_est(pub_date_dt)  # 转成美国东部时间
@@ -130,18 +114,26 @@ def fetch_news_for_ticker(ticker: str, count: int = 5) -> List[Dict]:
 
             news_entry = {
                 "ticker": ticker,
-                "title": content.get("title", "Unknown Title"),
-                "publisher": content.get("provider", {}).get("displayName", "Unknown Publisher"),
+                "title": record.title or "Unknown Title",
+                "publisher": record.source or "Unknown Publisher",
                 "published_at_utc": pub_date_dt.strftime("%Y-%m-%d %H:%M UTC"),  # 保留UTC格式
                 "published_at_est": pub_date_est,    # 转成EST/EDT显示
                 "time_ago": pub_time_ago,            # 本地感知
-                "link": content.get("provider", {}).get("url", ""),
+                "link": record.url,
             }
             news_data.append(news_entry)
+            records.append(record)
         except Exception as e:
             print(f"Error parsing news item for {ticker}: {e}")
             continue
 
+    # 写入统一的新闻库，供 /news 接口复用
+    store = news_store if store is None else store
+    try:
+        store.add(None, records)
+    except Exception as e:
+        print(f"Error storing news for {ticker}: {e}")
+
     return news_data
 
 